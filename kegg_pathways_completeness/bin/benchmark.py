@@ -0,0 +1,623 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright 2026 EMBL - European Bioinformatics Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import io
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from importlib.resources import files
+
+import click
+
+from . import parse_hmmer_table
+from .compiled_graphs import load_graphs
+from .give_completeness import (
+    DEFAULT_CACHE_SIZE,
+    CompletenessCalculator,
+    get_kos_dict,
+    load_modules_library,
+)
+from .utils import get_version, setup_logging
+
+BENCHMARKS = [
+    "import_time",
+    "load_graphs",
+    "get_kos_dict",
+    "parse_hmmer_table",
+    "finding_paths",
+    "calculate_percentage",
+    "sort_out_pathways",
+    "per_contig",
+]
+WORKLOADS = ["synthetic", "real"]
+DEFAULT_CONTIGS = [1000, 10000]
+DEFAULT_DENSITIES = [2, 8]
+DEFAULT_WORST_MODULES = 5
+DEFAULT_CALLS = 100
+# contigs scored one by one without cache in sort_out_pathways benchmark
+SORT_OUT_CONTIGS = 1000
+DEFAULT_THRESHOLD = 0.1
+# entry points of CLIs that are called for every sample in pipelines
+IMPORTED_MODULES = [
+    "kegg_pathways_completeness.bin.give_completeness",
+    "kegg_pathways_completeness.bin.parse_hmmer_table",
+]
+# dependencies that should be imported only by code paths that need them
+HEAVY_MODULES = ["graphviz", "networkx", "numpy", "pydot"]
+
+HMMER_HEADER = (
+    "# target name accession tlen query name accession qlen E-value score bias\n"
+)
+
+
+def generate_contigs(graphs, number, density, workload, seed=0):
+    """
+    Function generates contigs with KOs.
+    Number of KOs of contig is random from 1 to 2 * density - 1 (density on average).
+    :param graphs: CompiledGraphs, KOs are taken from them
+    :param number: number of contigs
+    :param density: average number of KOs per contig
+    :param workload: synthetic - KOs are taken from all KOs uniformly,
+                     real - KOs of contig are taken from one random module, so modules are partially complete
+    :param seed: seed of random generator
+    :return: generator of (contig_name, KOs)
+    """
+    rng = random.Random(seed)
+    if workload == "real":
+        pools = [sorted(graphs.module(num).labels) for num in range(len(graphs))]
+    else:
+        pools = [list(range(len(graphs.kos)))]
+    for num in range(number):
+        pool = rng.choice(pools)
+        size = min(len(pool), rng.randint(1, 2 * density - 1))
+        yield f"contig_{num}", [graphs.kos[label] for label in rng.sample(pool, size)]
+
+
+def write_contigs_table(contigs, filename):
+    """
+    Function writes contigs in give_completeness input format (contig\\tKO1\\tKO2...).
+    :param contigs: iterable of (contig_name, KOs)
+    :param filename: output file
+    """
+    with open(filename, "w") as file_out:
+        for contig, kos in contigs:
+            file_out.write(contig + "\t" + "\t".join(kos) + "\n")
+
+
+def write_hmmer_table(contigs, table_filename, fasta_filename):
+    """
+    Function writes hmmsearch domtblout with hit for every KO of contig and FASTA with proteins of contigs.
+    :param contigs: iterable of (contig_name, KOs)
+    :param table_filename: output HMMER table
+    :param fasta_filename: output FASTA
+    """
+    with open(table_filename, "w") as table, open(fasta_filename, "w") as fasta:
+        table.write(HMMER_HEADER)
+        for contig, kos in contigs:
+            protein = contig + "_1"
+            fasta.write(f">{protein} # 1 # 300 # 1\nMKV\n")
+            for KO in kos:
+                table.write(
+                    f"{protein} - 100 {KO} - 300 1e-50 200.0 0.1 1 1 1e-50 1e-50 199.0 0.1 "
+                    f"1 300 1 100 1 100 0.99 -\n"
+                )
+
+
+def worst_modules(graphs, number):
+    """
+    :param graphs: CompiledGraphs
+    :param number: number of modules
+    :return: positions of modules with the largest numbers of paths
+    """
+    counts = [(graphs.module(num).count_paths(), num) for num in range(len(graphs))]
+    return [num for _, num in sorted(counts, key=lambda item: -item[0])[:number]]
+
+
+def measure(function, repeat):
+    """
+    :param function: function without arguments
+    :param repeat: number of runs
+    :return: list of times in seconds
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def measure_import(module):
+    """
+    Function imports module in a new interpreter with -X importtime,
+    so modules that are already imported by benchmark are not reused.
+    :param module: name of module
+    :return: cumulative import time of module in seconds, list of HEAVY_MODULES imported with it
+    :raises click.ClickException: if module can not be imported or its import time is not reported
+    """
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    if process.returncode != 0:
+        error = process.stderr.strip().splitlines()
+        raise click.ClickException(
+            f"Import of {module} failed: {error[-1] if error else process.returncode}"
+        )
+    seconds, heavy = None, set()
+    # lines: "import time: <self us> | <cumulative us> | <indented name>"
+    for line in process.stderr.splitlines():
+        fields = line.split("|")
+        if not line.startswith("import time:") or not fields[1].strip().isdigit():
+            continue
+        name = fields[2].strip()
+        if name.split(".")[0] in HEAVY_MODULES:
+            heavy.add(name.split(".")[0])
+        if name == module:
+            seconds = int(fields[1]) / 10**6
+    if seconds is None:
+        # module is imported at start of interpreter, its time can not be measured
+        raise click.ClickException(
+            f"No import time of {module} in -X importtime output"
+        )
+    return seconds, sorted(heavy)
+
+
+def make_result(name, params, times):
+    return {
+        "name": name,
+        "params": params,
+        "times": times,
+        "min": min(times),
+        "median": statistics.median(times),
+    }
+
+
+class Benchmark:
+    def __init__(
+        self,
+        graphs_filename: str,
+        workdir: str,
+        benchmarks: list,
+        contigs: list,
+        densities: list,
+        workloads: list,
+        worst: int = DEFAULT_WORST_MODULES,
+        calls: int = DEFAULT_CALLS,
+        repeat: int = 3,
+        seed: int = 0,
+    ):
+        """
+        Benchmarks of completeness calculation on generated workloads.
+        Every workload (number of contigs x KO density x workload type) is written to workdir
+        and measured by every benchmark that depends on contigs.
+
+        :param graphs_filename: graphs in compiled (.kgc) or pickle format
+        :param workdir: directory for generated inputs and outputs
+        :param benchmarks: names of benchmarks from BENCHMARKS
+        :param contigs: list of numbers of contigs
+        :param densities: list of average numbers of KOs per contig
+        :param workloads: list of workload types from WORKLOADS
+        :param worst: number of modules with the largest numbers of paths for finding_paths and calculate_percentage
+        :param calls: number of calls of finding_paths and calculate_percentage in one run
+        :param repeat: number of runs of every benchmark
+        :param seed: seed of random generator
+        """
+        self.graphs_filename = graphs_filename
+        _, self.graphs, self.modules_info = load_modules_library(graphs=graphs_filename)
+        self.workdir = workdir
+        self.benchmarks = benchmarks
+        self.contigs = contigs
+        self.densities = densities
+        self.workloads = workloads
+        self.worst = worst
+        self.calls = calls
+        self.repeat = repeat
+        self.seed = seed
+        self.results = []
+
+    def make_calculator(self, contigs, cache_size=0):
+        modules_definitions, modules_names, modules_classes = self.modules_info
+        return CompletenessCalculator(
+            input_KOs=contigs,
+            outdir=self.workdir,
+            outprefix="benchmark",
+            graphs=self.graphs,
+            modules_definitions=modules_definitions,
+            modules_names=modules_names,
+            modules_classes=modules_classes,
+            include_weights=False,
+            plot_pathways=False,
+            per_contig=True,
+            cache_size=cache_size,
+        )
+
+    def add(self, name, params, function):
+        logging.info(f"Benchmark {name} {params}")
+        result = make_result(name, params, measure(function, self.repeat))
+        logging.info(f"  median {result['median']:.6f} s")
+        self.results.append(result)
+
+    def bench_imports(self):
+        if "import_time" not in self.benchmarks:
+            return
+        for module in IMPORTED_MODULES:
+            params = {"module": module.rsplit(".", 1)[-1]}
+            logging.info(f"Benchmark import_time {params}")
+            times = []
+            for _ in range(self.repeat):
+                seconds, heavy = measure_import(module)
+                times.append(seconds)
+            if heavy:
+                logging.warning(f"{module} imports {', '.join(heavy)}")
+            result = make_result("import_time", params, times)
+            logging.info(f"  median {result['median']:.6f} s")
+            self.results.append(result)
+
+    def bench_graphs(self):
+        if "load_graphs" in self.benchmarks:
+            self.add(
+                "load_graphs",
+                {"graphs": os.path.basename(str(self.graphs_filename))},
+                lambda: load_graphs(self.graphs_filename),
+            )
+        if (
+            "finding_paths" not in self.benchmarks
+            and "calculate_percentage" not in self.benchmarks
+        ):
+            return
+        calculator = self.make_calculator({})
+        rng = random.Random(self.seed)
+        for position in worst_modules(self.graphs, self.worst):
+            graph = self.graphs.module(position)
+            labels = sorted(graph.labels)
+            # half of KOs of module are presented
+            presented = frozenset(rng.sample(labels, len(labels) // 2))
+            params = {
+                "module": graph.name,
+                "paths": graph.count_paths(),
+                "calls": self.calls,
+            }
+            if "finding_paths" in self.benchmarks:
+                self.add(
+                    "finding_paths",
+                    params,
+                    lambda: [
+                        calculator.finding_paths(graph, presented)
+                        for _ in range(self.calls)
+                    ],
+                )
+            if "calculate_percentage" in self.benchmarks:
+                self.add(
+                    "calculate_percentage",
+                    params,
+                    lambda: [
+                        calculator.calculate_percentage(graph, presented)
+                        for _ in range(self.calls)
+                    ],
+                )
+
+    def bench_workload(self, number, density, workload):
+        params = {"contigs": number, "density": density, "workload": workload}
+        table = os.path.join(self.workdir, "contigs.tsv")
+        write_contigs_table(
+            generate_contigs(self.graphs, number, density, workload, self.seed), table
+        )
+        if "get_kos_dict" in self.benchmarks:
+            self.add(
+                "get_kos_dict",
+                params,
+                lambda: get_kos_dict(
+                    input_table=table, input_list=None, list_separator=","
+                ),
+            )
+        if "parse_hmmer_table" in self.benchmarks:
+            hmmer_table = os.path.join(self.workdir, "hmmer.tsv")
+            fasta = os.path.join(self.workdir, "proteins.faa")
+            write_hmmer_table(
+                generate_contigs(self.graphs, number, density, workload, self.seed),
+                hmmer_table,
+                fasta,
+            )
+            args = [
+                "-i",
+                hmmer_table,
+                "-f",
+                fasta,
+                "-t",
+                "hmmsearch",
+                "-o",
+                os.path.join(self.workdir, "parsed.tsv"),
+            ]
+            self.add(
+                "parse_hmmer_table",
+                params,
+                lambda: parse_hmmer_table.main.main(args=args, standalone_mode=False),
+            )
+        if (
+            "sort_out_pathways" not in self.benchmarks
+            and "per_contig" not in self.benchmarks
+        ):
+            return
+        contigs = get_kos_dict(input_table=table, input_list=None, list_separator=",")
+        if "sort_out_pathways" in self.benchmarks:
+            # cache is disabled, every contig is scored from scratch
+            calculator = self.make_calculator(contigs)
+            first_contigs = list(contigs.items())[:SORT_OUT_CONTIGS]
+
+            def sort_out():
+                with io.StringIO() as file_out:
+                    for contig, edges in first_contigs:
+                        calculator.sort_out_pathways(contig, file_out, edges)
+
+            self.add(
+                "sort_out_pathways", {**params, "scored": len(first_contigs)}, sort_out
+            )
+        if "per_contig" in self.benchmarks:
+            # new calculator for every run, so the cache is not shared between runs
+            self.add(
+                "per_contig",
+                params,
+                lambda: self.make_calculator(
+                    contigs, DEFAULT_CACHE_SIZE
+                ).generate_per_contig_summary(),
+            )
+
+    def run(self):
+        """
+        :return: list of results
+        """
+        self.bench_imports()
+        self.bench_graphs()
+        for number in self.contigs:
+            for density in self.densities:
+                for workload in self.workloads:
+                    self.bench_workload(number, density, workload)
+        return self.results
+
+
+def get_environment():
+    return {
+        "version": get_version(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+
+
+def result_key(result):
+    return result["name"], json.dumps(result["params"], sort_keys=True)
+
+
+def compare_results(old, new, threshold=DEFAULT_THRESHOLD):
+    """
+    Function compares medians of benchmarks with the same name and parameters.
+    :param old: results of baseline run (list of dicts)
+    :param new: results of new run
+    :param threshold: relative slowdown that is reported as regression (0.1 = 10%)
+    :return: list of (name, params, old median, new median, ratio new / old, is regression)
+    """
+    old_results = {result_key(result): result for result in old}
+    comparison = []
+    for result in new:
+        key = result_key(result)
+        if key not in old_results:
+            continue
+        old_median, new_median = old_results[key]["median"], result["median"]
+        ratio = new_median / old_median if old_median > 0 else float("inf")
+        comparison.append(
+            (key[0], key[1], old_median, new_median, ratio, ratio > 1 + threshold)
+        )
+    return comparison
+
+
+@click.group()
+@click.version_option(version=get_version(), prog_name="benchmark_completeness")
+def main():
+    """
+    Benchmarks of KEGG pathway completeness calculation.
+
+    \b
+    run      - times parts of the tool on generated workloads and saves results to JSON
+    compare  - compares two JSON files with results and reports regressions
+    """
+
+
+@main.command()
+@click.option(
+    "-o",
+    "--output",
+    default="benchmark.json",
+    help="Output JSON file with results",
+    show_default=True,
+)
+@click.option(
+    "-g",
+    "--graphs",
+    type=click.Path(exists=True),
+    help="Graphs in compiled (.kgc) or pickle format (default: uses packaged graphs.kgc)",
+)
+@click.option(
+    "-b",
+    "--benchmark",
+    "benchmarks",
+    type=click.Choice(BENCHMARKS),
+    multiple=True,
+    help="Benchmark to run, can be repeated (default: all)",
+)
+@click.option(
+    "-n",
+    "--contigs",
+    type=click.IntRange(min=1),
+    multiple=True,
+    help=f"Number of contigs in workload, can be repeated, ex. -n 1000 -n 10000000 (default: {DEFAULT_CONTIGS})",
+)
+@click.option(
+    "-d",
+    "--density",
+    "densities",
+    type=click.IntRange(min=1),
+    multiple=True,
+    help=f"Average number of KOs per contig, can be repeated (default: {DEFAULT_DENSITIES})",
+)
+@click.option(
+    "-w",
+    "--workload",
+    "workloads",
+    type=click.Choice(WORKLOADS),
+    multiple=True,
+    help="KOs of contigs: synthetic (random from all KOs) or real (subset of KOs of one module), can be repeated (default: both)",
+)
+@click.option(
+    "--worst-modules",
+    type=click.IntRange(min=1),
+    default=DEFAULT_WORST_MODULES,
+    help="Number of modules with the largest numbers of paths for finding_paths and calculate_percentage",
+    show_default=True,
+)
+@click.option(
+    "--calls",
+    type=click.IntRange(min=1),
+    default=DEFAULT_CALLS,
+    help="Calls of finding_paths and calculate_percentage in one run",
+    show_default=True,
+)
+@click.option(
+    "-r",
+    "--repeat",
+    type=click.IntRange(min=1),
+    default=3,
+    help="Number of runs of every benchmark",
+    show_default=True,
+)
+@click.option(
+    "--seed",
+    type=int,
+    default=0,
+    help="Seed of random generator of workloads",
+    show_default=True,
+)
+@click.option(
+    "--workdir",
+    type=click.Path(file_okay=False),
+    help="Directory for generated inputs (default: temporary directory, removed after run)",
+)
+@click.option(
+    "-v",
+    "--verbose",
+    is_flag=True,
+    help="Enable verbose logging",
+)
+def run(
+    output,
+    graphs,
+    benchmarks,
+    contigs,
+    densities,
+    workloads,
+    worst_modules,
+    calls,
+    repeat,
+    seed,
+    workdir,
+    verbose,
+):
+    """Run benchmarks and save results to JSON."""
+    setup_logging(verbose)
+    graphs_filename = (
+        graphs
+        if graphs
+        else files("kegg_pathways_completeness.pathways_data").joinpath("graphs.kgc")
+    )
+    temporary = workdir is None
+    workdir = tempfile.mkdtemp() if temporary else workdir
+    os.makedirs(workdir, exist_ok=True)
+    benchmark = Benchmark(
+        graphs_filename=graphs_filename,
+        workdir=workdir,
+        benchmarks=list(benchmarks) or BENCHMARKS,
+        contigs=list(contigs) or DEFAULT_CONTIGS,
+        densities=list(densities) or DEFAULT_DENSITIES,
+        workloads=list(workloads) or WORKLOADS,
+        worst=worst_modules,
+        calls=calls,
+        repeat=repeat,
+        seed=seed,
+    )
+    try:
+        results = benchmark.run()
+    finally:
+        if temporary:
+            shutil.rmtree(workdir)
+    with open(output, "w") as file_out:
+        json.dump(
+            {"environment": get_environment(), "repeat": repeat, "results": results},
+            file_out,
+            indent=2,
+        )
+    logging.info(f"Results saved to {output}")
+
+
+@main.command()
+@click.argument("baseline", type=click.Path(exists=True))
+@click.argument("current", type=click.Path(exists=True))
+@click.option(
+    "-t",
+    "--threshold",
+    type=click.FloatRange(min=0),
+    default=DEFAULT_THRESHOLD,
+    help="Relative slowdown of median time reported as regression",
+    show_default=True,
+)
+def compare(baseline, current, threshold):
+    """
+    Compare results of two runs (BASELINE and CURRENT JSON files).
+    Exits with code 1 if any benchmark is slower than BASELINE by more than threshold.
+    """
+    with open(baseline) as file_in:
+        old = json.load(file_in)["results"]
+    with open(current) as file_in:
+        new = json.load(file_in)["results"]
+    comparison = compare_results(old, new, threshold)
+    regressions = 0
+    click.echo("benchmark\tparams\tbaseline_s\tcurrent_s\tratio\tstatus")
+    for name, params, old_median, new_median, ratio, regression in comparison:
+        regressions += regression
+        status = "REGRESSION" if regression else "ok"
+        click.echo(
+            f"{name}\t{params}\t{old_median:.6f}\t{new_median:.6f}\t{ratio:.3f}\t{status}"
+        )
+    click.echo(
+        f"{len(comparison)} benchmarks compared, {regressions} regressions", err=True
+    )
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
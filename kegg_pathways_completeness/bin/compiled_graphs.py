@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright 2026 EMBL - European Bioinformatics Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import Mapping
+
+from .utils import parse_graphs_input
+
+COMPILED_GRAPHS_SUFFIX = ".kgc"
+COMPILED_GRAPHS_MAGIC = b"KGC\x01"
+COMPILED_GRAPHS_VERSION = 1
+
+# name: typecode of every array section in the file
+SECTIONS = {
+    # per module, offsets into per-node and per-edge arrays (length = modules + 1)
+    "module_nodes": "i",
+    "module_edges": "i",
+    "module_unnecessary": "i",
+    # per module, local index of the end node of pathway
+    "module_sink": "i",
+    # per node, id of node in networkx graph
+    "node_ids": "i",
+    # per edge, sorted by end node in topological order and then by order of predecessors
+    "edge_source": "i",
+    "edge_target": "i",
+    "edge_label": "i",
+    "edge_weight": "d",
+    "edge_weight_new": "d",
+    # per edge, 1 if weights are integers (0 or 1) in networkx graph
+    "edge_weight_is_int": "B",
+    # per edge, position in networkx adjacency order
+    "edge_rank": "i",
+    # labels of edges with weight 0
+    "unnecessary_label": "i",
+    # string tables: utf-8 data and offsets (length = strings + 1)
+    "modules_data": "B",
+    "modules_offsets": "i",
+    "kos_data": "B",
+    "kos_offsets": "i",
+}
+# optional string tables with columns of modules_table.tsv
+METADATA_COLUMNS = ["definitions", "names", "classes"]
+METADATA_SECTIONS = {
+    column + suffix: typecode
+    for column in METADATA_COLUMNS
+    for suffix, typecode in [("_data", "B"), ("_offsets", "i")]
+}
+
+
+class ModulesStrings(Mapping):
+    """Read-only dict of strings by module, strings are decoded on the first access."""
+
+    def __init__(self, positions, data, offsets):
+        self.positions = positions
+        self.data = data
+        self.offsets = offsets
+        self._decoded = {}
+
+    def __getitem__(self, name):
+        if name not in self._decoded:
+            position = self.positions[name]
+            start, end = self.offsets[position], self.offsets[position + 1]
+            self._decoded[name] = bytes(self.data[start:end]).decode("utf-8")
+        return self._decoded[name]
+
+    def __iter__(self):
+        return iter(self.positions)
+
+    def __len__(self):
+        return len(self.positions)
+
+
+class CompiledModule:
+    """Index-based view of one module graph used for scoring."""
+
+    def __init__(
+        self,
+        name,
+        sink,
+        node_ids,
+        source,
+        target,
+        label,
+        weight,
+        weight_new,
+        rank,
+        unnecessary,
+    ):
+        self.name = name
+        self.sink = sink
+        self.node_ids = node_ids
+        self.source = source
+        self.target = target
+        self.label = label
+        self.weight = weight
+        self.weight_new = weight_new
+        self.rank = rank
+        self.labels = frozenset(label)
+        self.unnecessary = unnecessary
+        # nodes without incoming edges are starts of paths
+        targets = set(target)
+        self.starts = [node for node in range(len(node_ids)) if node not in targets]
+
+    def count_paths(self):
+        """Returns number of paths to the end node, counted in one pass over edges in topological order"""
+        number_of_paths = [0] * len(self.node_ids)
+        for node in self.starts:
+            number_of_paths[node] = 1
+        for num in range(len(self.source)):
+            number_of_paths[self.target[num]] += number_of_paths[self.source[num]]
+        return number_of_paths[self.sink]
+
+
+class CompiledGraphs:
+    def __init__(self, sections: dict):
+        """
+        Compact representation of graphs of all modules.
+        Edges of all modules are stored in flat arrays, every module is a slice of them,
+        KOs are replaced with ids from a global table of labels.
+
+        :param sections: dict of arrays (or memoryviews of mapped file) by names from SECTIONS
+        """
+        self.sections = sections
+        self.modules = self._get_strings("modules")
+        self.kos = self._get_strings("kos")
+        self.ko_ids = {KO: num for num, KO in enumerate(self.kos)}
+        self.positions = {name: num for num, name in enumerate(self.modules)}
+        self._compiled_modules = [None] * len(self.modules)
+        # inverted index: KO id -> sorted list of positions of modules
+        self.modules_by_ko = {}
+        offsets, labels = sections["module_edges"], sections["edge_label"]
+        for position in range(len(self.modules)):
+            for label in sorted(set(labels[offsets[position]: offsets[position + 1]])):
+                self.modules_by_ko.setdefault(label, []).append(position)
+
+    def __len__(self):
+        return len(self.modules)
+
+    def __iter__(self):
+        return iter(self.modules)
+
+    def __contains__(self, name):
+        return name in self.positions
+
+    def _get_strings(self, name):
+        data = bytes(self.sections[name + "_data"])
+        offsets = self.sections[name + "_offsets"]
+        return [
+            data[offsets[num]: offsets[num + 1]].decode("utf-8")
+            for num in range(len(offsets) - 1)
+        ]
+
+    def get_modules_info(self):
+        """
+        Function returns modules information saved together with graphs
+        in the same format as parse_modules_table_tsv.
+        :return: (modules_definitions, modules_names, modules_classes) or None if they were not saved
+        """
+        if any(column + "_data" not in self.sections for column in METADATA_COLUMNS):
+            return None
+        return tuple(
+            ModulesStrings(
+                self.positions,
+                self.sections[column + "_data"],
+                self.sections[column + "_offsets"],
+            )
+            for column in METADATA_COLUMNS
+        )
+
+    def module(self, position):
+        """Returns CompiledModule by position, modules are unpacked on the first use"""
+        if self._compiled_modules[position] is None:
+            sections = self.sections
+            nodes = slice(*sections["module_nodes"][position: position + 2])
+            edges = slice(*sections["module_edges"][position: position + 2])
+            unnecessary = slice(
+                *sections["module_unnecessary"][position: position + 2]
+            )
+            self._compiled_modules[position] = CompiledModule(
+                name=self.modules[position],
+                sink=sections["module_sink"][position],
+                node_ids=list(sections["node_ids"][nodes]),
+                source=list(sections["edge_source"][edges]),
+                target=list(sections["edge_target"][edges]),
+                label=list(sections["edge_label"][edges]),
+                weight=_restore_weights(sections, "edge_weight", edges),
+                weight_new=_restore_weights(sections, "edge_weight_new", edges),
+                rank=list(sections["edge_rank"][edges]),
+                unnecessary=list(sections["unnecessary_label"][unnecessary]),
+            )
+        return self._compiled_modules[position]
+
+    def to_networkx(self, names=None):
+        """
+        Function restores graphs in format of graphs.pkl (for plotting).
+        :param names: list of modules, all modules by default
+        :return: dict of (graph, dict_edges, unnecessary_nodes) by module
+        """
+        import networkx as nx
+
+        graphs = {}
+        for name in self.modules if names is None else names:
+            compiled = self.module(self.positions[name])
+            G = nx.MultiDiGraph()
+            G.add_nodes_from(compiled.node_ids)
+            dict_edges = {}
+            for num in sorted(range(len(compiled.rank)), key=compiled.rank.__getitem__):
+                start = compiled.node_ids[compiled.source[num]]
+                finish = compiled.node_ids[compiled.target[num]]
+                KO = self.kos[compiled.label[num]]
+                weight = compiled.weight[num]
+                G.add_edge(
+                    start,
+                    finish,
+                    label=KO,
+                    weight=weight,
+                    weight_new=compiled.weight_new[num],
+                    name="-" if weight == 0 else "node",
+                )
+                dict_edges.setdefault(KO, []).append([start, finish])
+            unnecessary_nodes = [self.kos[label] for label in compiled.unnecessary]
+            graphs[name] = tuple([G, dict_edges, unnecessary_nodes])
+        return graphs
+
+    def save(self, filename):
+        """
+        Saves graphs into binary file:
+        magic, length of header, json header with positions of sections, aligned sections.
+        """
+        header = {
+            "version": COMPILED_GRAPHS_VERSION,
+            "byteorder": "little",
+            "sections": {},
+        }
+        payload, offset = [], 0
+        for name, typecode in {**SECTIONS, **METADATA_SECTIONS}.items():
+            if name not in self.sections:
+                continue
+            values = array(typecode, self.sections[name])
+            if sys.byteorder == "big":
+                values.byteswap()
+            data = values.tobytes()
+            header["sections"][name] = [typecode, offset, len(values)]
+            padding = -len(data) % 8
+            payload.append(data + b"\0" * padding)
+            offset += len(data) + padding
+        header = json.dumps(header, sort_keys=True).encode("utf-8")
+        header += b" " * (-(len(header) + 8) % 8)
+        with open(filename, "wb") as file_out:
+            file_out.write(COMPILED_GRAPHS_MAGIC)
+            file_out.write(struct.pack("<I", len(header)))
+            file_out.write(header)
+            for data in payload:
+                file_out.write(data)
+
+    @classmethod
+    def load(cls, filename):
+        """
+        Loads graphs from binary file. File is mapped into memory read-only and sections
+        are used in place, so processes that load the same file share its pages.
+        """
+        with open(filename, "rb") as file_in:
+            if file_in.read(4) != COMPILED_GRAPHS_MAGIC:
+                raise ValueError(f"{filename} is not a compiled graphs file")
+            buffer = mmap.mmap(file_in.fileno(), 0, access=mmap.ACCESS_READ)
+        data = memoryview(buffer)
+        (header_length,) = struct.unpack("<I", data[4:8])
+        header = json.loads(bytes(data[8: 8 + header_length]).decode("utf-8"))
+        if header["version"] != COMPILED_GRAPHS_VERSION:
+            raise ValueError(
+                f"Unsupported version {header['version']} of compiled graphs {filename}"
+            )
+        start = 8 + header_length
+        sections = {}
+        for name, (typecode, offset, length) in header["sections"].items():
+            itemsize = array(typecode).itemsize
+            values = data[start + offset: start + offset + length * itemsize]
+            if sys.byteorder == header["byteorder"]:
+                sections[name] = values.cast(typecode)
+            else:
+                sections[name] = array(typecode, values.tobytes())
+                sections[name].byteswap()
+        return cls(sections)
+
+
+def _add_strings(sections, name, strings):
+    data = [string.encode("utf-8") for string in strings]
+    offsets = [0]
+    for item in data:
+        offsets.append(offsets[-1] + len(item))
+    sections[name + "_data"] = array("B", b"".join(data))
+    sections[name + "_offsets"] = array("i", offsets)
+
+
+def _restore_weights(sections, name, edges):
+    """Weights of edges with types of networkx graph, they are printed with --include-weights"""
+    return [
+        int(weight) if is_int else weight
+        for weight, is_int in zip(
+            sections[name][edges], sections["edge_weight_is_int"][edges]
+        )
+    ]
+
+
+def compile_graphs(graphs, modules_info=None):
+    """
+    Function converts graphs in networkx format (graphs.pkl) into CompiledGraphs.
+    Edges of every module are ordered by their end node in topological order
+    and by order of predecessors of that node, as paths are sorted out in finding_paths.
+    :param graphs: dict of (graph, dict_edges, unnecessary_nodes) by module
+    :param modules_info: optional (modules_definitions, modules_names, modules_classes)
+                         to save together with graphs
+    :return: CompiledGraphs
+    """
+    import networkx as nx
+
+    sections = {name: array(typecode) for name, typecode in SECTIONS.items()}
+    for name in ["module_nodes", "module_edges", "module_unnecessary"]:
+        sections[name].append(0)
+    kos, ko_ids = [], {}
+
+    def get_ko_id(KO):
+        if KO not in ko_ids:
+            ko_ids[KO] = len(kos)
+            kos.append(KO)
+        return ko_ids[KO]
+
+    for name_pathway in graphs:
+        G, _, unnecessary_nodes = graphs[name_pathway]
+        nodes = {node: num for num, node in enumerate(G.nodes)}
+        ranks = {edge: num for num, edge in enumerate(G.edges(keys=True))}
+        for node in nx.topological_sort(G):
+            for pred, edges in G.pred[node].items():
+                for key, data in edges.items():
+                    sections["edge_source"].append(nodes[pred])
+                    sections["edge_target"].append(nodes[node])
+                    sections["edge_label"].append(get_ko_id(data["label"]))
+                    sections["edge_weight"].append(data["weight"])
+                    sections["edge_weight_new"].append(data["weight_new"])
+                    sections["edge_weight_is_int"].append(
+                        isinstance(data["weight"], int)
+                    )
+                    sections["edge_rank"].append(ranks[(pred, node, key)])
+        unnecessary = [get_ko_id(KO) for KO in unnecessary_nodes]
+        sections["node_ids"].extend(nodes)
+        sections["unnecessary_label"].extend(unnecessary)
+        sections["module_sink"].append(nodes[1])
+        sections["module_nodes"].append(len(sections["node_ids"]))
+        sections["module_edges"].append(len(sections["edge_source"]))
+        sections["module_unnecessary"].append(len(sections["unnecessary_label"]))
+    _add_strings(sections, "modules", list(graphs))
+    _add_strings(sections, "kos", kos)
+    for column, values in zip(METADATA_COLUMNS, modules_info or []):
+        _add_strings(sections, column, [values[name] for name in graphs])
+    return CompiledGraphs(sections)
+
+
+def load_graphs(filename):
+    """
+    Function loads graphs of modules for scoring.
+    Compiled graphs (.kgc) are read as they are, graphs.pkl is compiled after loading.
+    :param filename: graphs.kgc or graphs.pkl
+    :return: CompiledGraphs
+    """
+    filename = str(filename)
+    if not os.path.exists(filename):
+        logging.error(f"No graphs {filename} file found")
+        return None
+    if filename.endswith(COMPILED_GRAPHS_SUFFIX):
+        return CompiledGraphs.load(filename)
+    return compile_graphs(parse_graphs_input(filename))
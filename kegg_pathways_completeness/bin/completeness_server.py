@@ -0,0 +1,519 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright 2026 EMBL - European Bioinformatics Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import os
+import signal
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+
+import click
+
+from .give_completeness import (
+    DEFAULT_CACHE_SIZE,
+    CompletenessCalculator,
+    load_modules_library,
+)
+from .utils import get_version, setup_logging
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# largest accepted body of request in bytes
+DEFAULT_MAX_REQUEST_SIZE = 64 * 2**20
+# largest accepted request line with headers in bytes
+MAX_HEADERS_SIZE = 64 * 2**10
+# columns of give_completeness tables, per-contig rows have contig column first
+SUMMARY_COLUMNS = [
+    "module_accession",
+    "completeness",
+    "pathway_name",
+    "pathway_class",
+    "matching_ko",
+    "missing_ko",
+]
+
+# calculator of worker process with graphs and scores cache, created once by load_calculator
+_calculator = None
+
+
+def load_calculator(graphs, modules_table, settings):
+    """
+    Initializer of worker process: graphs and modules information are loaded once,
+    scores of modules stay in cache of calculator between requests.
+    :param graphs: graphs in compiled (.kgc) or pickle format
+    :param modules_table: modules table in TSV format
+    :param settings: include_weights and cache_size for CompletenessCalculator
+    """
+    global _calculator
+    _, modules_graphs, modules_info = load_modules_library(
+        graphs=graphs, modules_table=modules_table
+    )
+    modules_definitions, modules_names, modules_classes = modules_info
+    _calculator = CompletenessCalculator(
+        input_KOs={},
+        # results are returned to server, nothing is written
+        outdir=tempfile.gettempdir(),
+        outprefix="server",
+        graphs=modules_graphs,
+        modules_names=modules_names,
+        modules_classes=modules_classes,
+        modules_definitions=modules_definitions,
+        plot_pathways=False,
+        per_contig=False,
+        **settings,
+    )
+
+
+def library_info():
+    """
+    :return: number of modules loaded by worker process
+    """
+    return len(_calculator.graphs)
+
+
+def score_request(contigs, per_contig):
+    """
+    Function calculates completeness in worker process.
+    :param contigs: list of (contig_name, KOs)
+    :param per_contig: add completeness of every contig
+    :return: dict with pathways (for all KOs together) and contigs rows
+    """
+    edges = set()
+    for _, kos in contigs:
+        edges.update(kos)
+    with io.StringIO() as lines:
+        _calculator.sort_out_pathways(
+            contig_name="", file_out_summary=lines, edges=edges
+        )
+        result = {"pathways": parse_rows(lines.getvalue(), contig=False)}
+    if per_contig:
+        with io.StringIO() as lines:
+            _calculator.write_contigs(contigs, lines)
+            result["contigs"] = parse_rows(lines.getvalue(), contig=True)
+    return result
+
+
+def parse_rows(lines, contig):
+    """
+    Function converts lines of give_completeness table into JSON records.
+    :param lines: lines without header
+    :param contig: lines have contig column
+    :return: list of dicts by columns, KOs are lists
+    """
+    columns = ["contig"] + SUMMARY_COLUMNS if contig else SUMMARY_COLUMNS
+    rows = []
+    for line in lines.splitlines():
+        row = dict(zip(columns, line.split("\t")))
+        row["completeness"] = float(row["completeness"])
+        for column in ["matching_ko", "missing_ko"]:
+            row[column] = row[column].split(",") if row[column] else []
+        rows.append(row)
+    return rows
+
+
+class RequestError(Exception):
+    def __init__(self, status, message):
+        """
+        Error of HTTP request answered with status,
+        connection is closed if the request itself can not be read.
+        :param status: HTTP status
+        :param message: error returned in JSON response
+        """
+        super().__init__(message)
+        self.status = status
+
+
+def parse_request(request):
+    """
+    Function validates request for completeness. Request is JSON object with one of
+    kos (list of KOs), contigs ({contig_name: [KOs]}) or table (text in format of --input)
+    and optional per_contig flag (not for kos).
+    :param request: parsed JSON
+    :return: list of (contig_name, KOs), per_contig
+    :raises RequestError: (400) for empty or whitespace-only contig name
+    """
+    if not isinstance(request, dict):
+        raise ValueError("Request has to be JSON object")
+    inputs = [key for key in ["kos", "contigs", "table"] if key in request]
+    if len(inputs) != 1:
+        raise ValueError("Request has to contain one of: kos, contigs or table")
+    per_contig = request.get("per_contig", False)
+    if not isinstance(per_contig, bool):
+        raise ValueError("per_contig has to be true or false")
+    if "kos" in request:
+        if per_contig:
+            raise ValueError("per_contig works only with contigs or table")
+        if not isinstance(request["kos"], list):
+            raise ValueError("kos has to be list of KOs")
+        contigs = [("", request["kos"])]
+    elif "contigs" in request:
+        if not isinstance(request["contigs"], dict):
+            raise ValueError("contigs has to be object {contig_name: [KOs]}")
+        contigs = list(request["contigs"].items())
+    else:
+        if not isinstance(request["table"], str):
+            raise ValueError("table has to be string")
+        contigs = {}
+        for line in request["table"].splitlines():
+            if not line.strip():
+                continue
+            # leading tab is kept, so row without contig name is rejected below
+            line = line.rstrip().split("\t")
+            contigs.setdefault(line[0], []).extend(line[1:])
+        contigs = list(contigs.items())
+    for contig, kos in contigs:
+        if "kos" not in request and not contig.strip():
+            # rows of per-contig output are matched to contigs by names
+            raise RequestError(400, "Contig name can not be empty")
+        if "\t" in contig or "\n" in contig:
+            raise ValueError(f"Wrong contig name {contig!r}")
+        if not isinstance(kos, list) or not all(isinstance(KO, str) for KO in kos):
+            raise ValueError(f"KOs of contig {contig!r} have to be list of strings")
+    return contigs, per_contig
+
+
+class CompletenessServer:
+    def __init__(
+        self,
+        graphs: str = None,
+        modules_table: str = None,
+        threads: int = 1,
+        include_weights: bool = False,
+        cache_size: int = DEFAULT_CACHE_SIZE,
+        max_request_size: int = DEFAULT_MAX_REQUEST_SIZE,
+    ):
+        """
+        Server keeps graphs, modules information and scores cache resident in worker processes
+        and answers requests over local HTTP or Unix socket with JSON.
+        Connections are handled by asyncio, completeness is calculated by pool of worker processes.
+
+        :param graphs: graphs in compiled (.kgc) or pickle format (default: packaged graphs.kgc)
+        :param modules_table: modules table in TSV format (default: data saved in graphs)
+        :param threads: number of worker processes
+        :param include_weights: add weights of KOs to matching_ko and missing_ko
+        :param cache_size: number of module scores kept by every worker process
+        :param max_request_size: largest accepted body of request in bytes
+        """
+        self.graphs = graphs
+        self.modules_table = modules_table
+        self.threads = threads
+        self.settings = {"include_weights": include_weights, "cache_size": cache_size}
+        self.max_request_size = max_request_size
+        self.executor = None
+        self.modules_number = None
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT, socket_path=None):
+        """
+        Function starts worker processes, waits until they load graphs and starts listening.
+        :param host: host of HTTP server
+        :param port: port of HTTP server
+        :param socket_path: Unix socket, used instead of host and port
+        :return: asyncio.Server
+        """
+        logger = logging.getLogger(__name__)
+        loop = asyncio.get_running_loop()
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.threads,
+            initializer=load_calculator,
+            initargs=(self.graphs, self.modules_table, self.settings),
+        )
+        # every worker loads graphs before the first request
+        modules_numbers = await asyncio.gather(
+            *[
+                loop.run_in_executor(self.executor, library_info)
+                for _ in range(self.threads)
+            ]
+        )
+        self.modules_number = modules_numbers[0]
+        if socket_path:
+            server = await asyncio.start_unix_server(
+                self.handle_connection, path=socket_path
+            )
+            logger.info(f"Listening on {socket_path}")
+        else:
+            server = await asyncio.start_server(self.handle_connection, host, port)
+            logger.info(f"Listening on http://{host}:{port}")
+        logger.info(f"{self.modules_number} modules loaded by {self.threads} workers")
+        return server
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+
+    async def read_request(self, reader):
+        """
+        Function reads one HTTP request, malformed and too large requests raise RequestError.
+        :param reader: asyncio.StreamReader of connection
+        :return: method, path, version, headers, body or None if connection is closed
+        """
+        try:
+            request_line = await reader.readline()
+            if not request_line:
+                return None
+            headers, headers_size = {}, len(request_line)
+            while True:
+                line = await reader.readline()
+                headers_size += len(line)
+                if headers_size > MAX_HEADERS_SIZE:
+                    raise RequestError(413, "Request headers are too large")
+                if line in [b"\r\n", b"\n", b""]:
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+        except (ValueError, asyncio.LimitOverrunError):
+            # line is longer than limit of stream
+            raise RequestError(413, "Request line or header is too large")
+        try:
+            method, path, version = request_line.decode("latin-1").split()
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            raise RequestError(400, "Bad request")
+        if length < 0:
+            raise RequestError(400, "Wrong Content-Length")
+        if length > self.max_request_size:
+            raise RequestError(413, "Request is too large")
+        try:
+            body = await reader.readexactly(length)
+        except asyncio.IncompleteReadError:
+            raise RequestError(400, "Request body is shorter than Content-Length")
+        return method, path, version, headers, body
+
+    async def handle_connection(self, reader, writer):
+        """
+        Function answers HTTP/1.1 requests of connection one by one (keep-alive is supported).
+        """
+        try:
+            while True:
+                try:
+                    request = await self.read_request(reader)
+                except RequestError as error:
+                    await self.respond(
+                        writer, error.status, {"error": str(error)}, False
+                    )
+                    break
+                if request is None:
+                    break
+                method, path, version, headers, body = request
+                keep_alive = (
+                    version == "HTTP/1.1"
+                    and headers.get("connection", "").lower() != "close"
+                )
+                start = time.perf_counter()
+                status, response = await self.handle_request(
+                    method, path.split("?")[0], body
+                )
+                await self.respond(writer, status, response, keep_alive)
+                logging.debug(
+                    f"{method} {path} {status} {(time.perf_counter() - start) * 1000:.1f} ms"
+                )
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+
+    async def handle_request(self, method, path, body):
+        """
+        :param method: HTTP method
+        :param path: path without query
+        :param body: bytes of body
+        :return: HTTP status, JSON response
+        """
+        if path == "/health":
+            if method != "GET":
+                return 405, {"error": "Use GET for /health"}
+            return 200, {
+                "status": "ok",
+                "version": get_version(),
+                "modules": self.modules_number,
+                "workers": self.threads,
+            }
+        if path == "/completeness":
+            if method != "POST":
+                return 405, {"error": "Use POST for /completeness"}
+            try:
+                contigs, per_contig = parse_request(json.loads(body))
+            except RequestError as error:
+                return error.status, {"error": str(error)}
+            except ValueError as error:
+                return 400, {"error": str(error)}
+            loop = asyncio.get_running_loop()
+            try:
+                result = await loop.run_in_executor(
+                    self.executor, score_request, contigs, per_contig
+                )
+            except Exception as error:
+                logging.exception("Completeness calculation failed")
+                return 500, {"error": str(error)}
+            return 200, result
+        return 404, {"error": f"Unknown path {path}"}
+
+    @staticmethod
+    async def respond(writer, status, response, keep_alive):
+        body = json.dumps(response).encode("utf-8")
+        head = "\r\n".join(
+            [
+                f"HTTP/1.1 {status} {HTTPStatus(status).phrase}",
+                "Content-Type: application/json",
+                f"Content-Length: {len(body)}",
+                f"Connection: {'keep-alive' if keep_alive else 'close'}",
+                "",
+                "",
+            ]
+        )
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+
+async def serve(server, host, port, socket_path):
+    """
+    Function runs server until SIGTERM or Ctrl+C.
+    """
+    asyncio_server = await server.start(host, port, socket_path)
+    loop = asyncio.get_running_loop()
+    loop.add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    try:
+        async with asyncio_server:
+            await asyncio_server.serve_forever()
+    except asyncio.CancelledError:
+        pass
+    finally:
+        server.close()
+        if socket_path and os.path.exists(socket_path):
+            os.remove(socket_path)
+
+
+@click.command()
+@click.option(
+    "-g",
+    "--graphs",
+    type=click.Path(exists=True),
+    help="Graphs in compiled (.kgc) or pickle format (default: uses packaged graphs.kgc)",
+)
+@click.option(
+    "-t",
+    "--modules-table",
+    type=click.Path(exists=True),
+    help="Modules table in TSV format (default: uses data saved in compiled graphs or packaged modules_table.tsv)",
+)
+@click.option(
+    "--host",
+    default=DEFAULT_HOST,
+    help="Host of HTTP server",
+    show_default=True,
+)
+@click.option(
+    "--port",
+    type=click.IntRange(min=0, max=65535),
+    default=DEFAULT_PORT,
+    help="Port of HTTP server",
+    show_default=True,
+)
+@click.option(
+    "--socket",
+    "socket_path",
+    type=click.Path(dir_okay=False),
+    help="Listen on Unix socket instead of host and port",
+)
+@click.option(
+    "-j",
+    "--threads",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Number of worker processes calculating completeness",
+    show_default=True,
+)
+@click.option(
+    "-w",
+    "--include-weights",
+    is_flag=True,
+    help="Add weights for each KO in output",
+)
+@click.option(
+    "--cache-size",
+    type=click.IntRange(min=0),
+    default=DEFAULT_CACHE_SIZE,
+    help="Number of module scores kept by every worker process for reuse between requests (0 disables cache)",
+    show_default=True,
+)
+@click.option(
+    "--max-request-size",
+    type=click.IntRange(min=1),
+    default=DEFAULT_MAX_REQUEST_SIZE,
+    help="Largest accepted body of request in bytes",
+    show_default=True,
+)
+@click.option(
+    "-v",
+    "--verbose",
+    is_flag=True,
+    help="Enable verbose logging",
+)
+@click.version_option(version=get_version(), prog_name="completeness_server")
+def main(
+    graphs,
+    modules_table,
+    host,
+    port,
+    socket_path,
+    threads,
+    include_weights,
+    cache_size,
+    max_request_size,
+    verbose,
+):
+    """
+    Serve completeness of KEGG modules over local HTTP or Unix socket.
+
+    Graphs and modules data are loaded once, so small requests are answered in milliseconds.
+
+    \b
+    Endpoints:
+    - GET /health: version and number of loaded modules
+    - POST /completeness: JSON with one of
+      {"kos": [KOs]},
+      {"contigs": {contig_name: [KOs]}, "per_contig": true},
+      {"table": "contig\\tKO1\\tKO2\\n...", "per_contig": true}
+    """
+    setup_logging(verbose)
+    server = CompletenessServer(
+        graphs=graphs,
+        modules_table=modules_table,
+        threads=threads,
+        include_weights=include_weights,
+        cache_size=cache_size,
+        max_request_size=max_request_size,
+    )
+    try:
+        asyncio.run(serve(server, host, port, socket_path))
+    except KeyboardInterrupt:
+        pass
+    logging.info("Bye!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright 2026 EMBL - European Bioinformatics Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+# Parser of module definitions in one pass over the string.
+#
+# Separators from the loosest to the tightest: ',' (alternatives), ' ' (steps of pathway),
+# '+' (components of complex), '-' (optional components), brackets group expressions.
+# Definition is parsed into tree of tuples:
+#   ("KO", start, end)   - KO at definition[start:end]
+#   ("-KO", start, end)  - optional KO written as -KO
+#   ("--",)              - missing KO
+#   (separator, [children]) for ',', ' ', '+' and '-'
+# Definitions that make_graphs parsed in a special way (empty parts, groups without separator
+# between them like "(A)(B)", -(A B), unbalanced brackets) are not accepted and raise ValueError.
+
+SEPARATORS = [",", " ", "+", "-"]
+SPECIAL_CHARS = set(SEPARATORS) | {"(", ")"}
+
+
+def tokenize(definition):
+    """
+    Function splits definition into tokens.
+    :param definition: string expression
+    :return: list of (token, start, end), token is "KO" for KOs or separator/bracket itself
+    """
+    tokens = []
+    start = None
+    for index, c in enumerate(definition):
+        if c in SPECIAL_CHARS:
+            if start is not None:
+                tokens.append(("KO", start, index))
+                start = None
+            tokens.append((c, index, index + 1))
+        elif start is None:
+            start = index
+    if start is not None:
+        tokens.append(("KO", start, len(definition)))
+    return tokens
+
+
+class DefinitionParser:
+    def __init__(self, definition):
+        """
+        Precedence parser of module definition.
+        :param definition: string expression
+        """
+        self.definition = definition
+        self.tokens = tokenize(definition)
+        self.position = 0
+
+    def peek(self, shift=0):
+        """
+        :return: type of token at current position + shift (None after the last token)
+        """
+        position = self.position + shift
+        return self.tokens[position][0] if position < len(self.tokens) else None
+
+    def error(self, message):
+        raise ValueError(f"{message} at token {self.position} of '{self.definition}'")
+
+    def parse(self):
+        """
+        :return: tree of definition
+        """
+        tree = self.parse_level(0)
+        if self.peek() is not None:
+            self.error("Unexpected token")
+        return tree
+
+    def parse_level(self, level):
+        """
+        Function parses expression joined by separator of level and tighter ones.
+        :param level: index of separator in SEPARATORS
+        :return: tree of expression
+        """
+        if level == len(SEPARATORS) - 1:
+            return self.parse_optional()
+        separator = SEPARATORS[level]
+        children = [self.parse_level(level + 1)]
+        while self.peek() == separator:
+            self.position += 1
+            children.append(self.parse_level(level + 1))
+        return children[0] if len(children) == 1 else (separator, children)
+
+    def parse_optional(self):
+        """
+        Function parses optional components: A-B-C, -A or --.
+        Leading '-' is allowed only before single KO and '--' only as whole part.
+        :return: tree of expression
+        """
+        if self.peek() == "-":
+            if self.peek(1) == "-":
+                self.position += 2
+                node = ("--",)
+            elif self.peek(1) == "KO":
+                _, start, end = self.tokens[self.position + 1]
+                self.position += 2
+                node = ("-KO", start, end)
+            else:
+                self.error("Unexpected '-'")
+            if self.peek() == "-":
+                self.error("Unexpected '-'")
+            return node
+        children = [self.parse_atom()]
+        while self.peek() == "-":
+            self.position += 1
+            children.append(self.parse_atom())
+        return children[0] if len(children) == 1 else ("-", children)
+
+    def parse_atom(self):
+        """
+        Function parses KO or expression in brackets.
+        :return: tree of expression
+        """
+        token = self.peek()
+        if token == "KO":
+            _, start, end = self.tokens[self.position]
+            self.position += 1
+            return ("KO", start, end)
+        if token == "(":
+            self.position += 1
+            node = self.parse_level(0)
+            if self.peek() != ")":
+                self.error("Expected ')'")
+            if node == ("--",):
+                self.error("Missing KO in brackets")
+            self.position += 1
+            return node
+        self.error("Expected KO or '('")
+
+
+def parse_definition(definition):
+    """
+    Function parses module definition.
+    :param definition: string expression
+    :return: tree of definition
+    """
+    return DefinitionParser(definition).parse()
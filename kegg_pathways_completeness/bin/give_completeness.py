@@ -15,54 +15,42 @@
 # limitations under the License.
 
 
-import copy
+import collections
+import functools
+import io
+import itertools
 import logging
 import os
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 from importlib.resources import files
 
 import click
-import networkx as nx
 
-from .plot_modules_graphs import PlotModuleCompletenessGraph
-from .utils import get_version, intersection, parse_graphs_input, setup_logging
-
-
-def parse_modules_table_tsv(tsv_file):
-    """
-    Parse new TSV format file (modules_table.tsv) into separate dictionaries.
-    Returns: (modules_definitions, modules_names, modules_classes)
-    """
-    modules_definitions = {}
-    modules_names = {}
-    modules_classes = {}
-
-    with open(tsv_file, "r") as f:
-        # Read header
-        header = f.readline().strip().split("\t")
-
-        # Validate header
-        required_cols = ["module", "definition", "name", "class"]
-        for col in required_cols:
-            if col not in header:
-                raise ValueError(f"TSV file must have '{col}' column")
-
-        module_idx = header.index("module")
-        definition_idx = header.index("definition")
-        name_idx = header.index("name")
-        class_idx = header.index("class")
-
-        # Read data rows
-        for line in f:
-            if line.strip():
-                fields = line.strip().split("\t")
-                if len(fields) > max(module_idx, definition_idx, name_idx, class_idx):
-                    module = fields[module_idx]
-                    modules_definitions[module] = fields[definition_idx]
-                    modules_names[module] = fields[name_idx]
-                    modules_classes[module] = fields[class_idx]
-
-    return modules_definitions, modules_names, modules_classes
+from .compiled_graphs import CompiledGraphs, load_graphs
+from .profiler import Profiler, stage
+from .utils import get_version, open_file, parse_modules_table_tsv, setup_logging
+
+# upper bound for Dinkelbach iterations in finding_paths, usually 2-4 are enough
+MAX_RATIO_ITERATIONS = 100
+# absolute slack for prefixes that can still be a part of the best path
+RATIO_TOLERANCE = 1e-9
+# number of scored (module, KOs of module) combinations to keep
+DEFAULT_CACHE_SIZE = 65536
+# contigs sent to a worker process at once with --threads
+CONTIGS_PER_TASK = 256
+# number of tasks submitted ahead per worker, results are written in input order
+PENDING_TASKS_PER_THREAD = 4
+# contigs read at once from input table with --streaming
+DEFAULT_CHUNK_SIZE = 10000
+# compression of output tables, added to their extension
+COMPRESSIONS = ["gz", "zst"]
+# suffix of JSON with timings written with --profile
+PROFILE_SUFFIX = "_profile.json"
+
+# calculator of worker process, created once by init_worker
+_worker_calculator = None
 
 
 class CompletenessCalculator:
@@ -74,16 +62,33 @@ class CompletenessCalculator:
         include_weights: bool,
         plot_pathways: bool,
         per_contig: bool,
-        graphs: nx.MultiDiGraph,
+        graphs: CompiledGraphs,
         modules_definitions: str = None,
         modules_classes: str = None,
         modules_names: str = None,
+        cache_size: int = DEFAULT_CACHE_SIZE,
+        threads: int = 1,
+        graphs_filename: str = None,
+        input_chunks=None,
+        compression: str = None,
+        profiler: Profiler = None,
     ):
         # input KOs
         self.dict_KO_by_contigs = input_KOs
+        # percentage by module for whole list of KOs, filled by generate_common_summary
+        self.modules_completeness = {}
+        # iterable of dicts of KOs by contigs, used instead of input_KOs in streaming mode
+        self.input_chunks = input_chunks
 
         # modules graphs
         self.graphs = graphs
+        # scores depend only on presented KOs of module, many contigs share them
+        self.cache_size = cache_size
+        self.score_module = functools.lru_cache(maxsize=cache_size)(self._score_module)
+        # cache usage of worker processes
+        self.workers_cache_hits, self.workers_cache_misses = 0, 0
+        # timings of stages and modules, None if profiling is disabled
+        self.profiler = profiler
 
         # modules info
         self.modules_definitions = modules_definitions
@@ -114,12 +119,28 @@ class CompletenessCalculator:
             self.name_contigs_output_summary = os.path.join(
                 self.name_output + "_contigs.tsv"
             )
+        self.compression = compression
+        if self.compression:
+            self.name_common_output_summary += "." + self.compression
+            self.name_contigs_output_summary += "." + self.compression
         self.plot_pathways = plot_pathways
         self.per_contig = per_contig
+        # worker processes load graphs from file by themselves
+        self.threads = threads
+        self.graphs_filename = graphs_filename
+        if self.threads > 1 and not self.graphs_filename:
+            logging.warning(
+                "No graphs file provided for worker processes, using 1 thread"
+            )
+            self.threads = 1
 
-        self.edges = self.get_edges_list()
-        # !!!! careful - it was used a deepcopy
-        self.weights_of_KOs = self.get_weights_for_KOs(copy.deepcopy(self.graphs))
+        # in streaming mode KOs are added while contigs are read
+        self.edges = set() if self.input_chunks is not None else self.get_edges_list()
+        # graphs are only read during scoring, no copy is needed
+        self.weights_of_KOs = {}
+        if self.include_weights:
+            with stage(self.profiler, "weights_extraction"):
+                self.weights_of_KOs = self.get_weights_for_KOs(self.graphs)
 
     def get_edges_list(self):
         items = []
@@ -127,161 +148,224 @@ class CompletenessCalculator:
             items += self.dict_KO_by_contigs[contig]
         return list(set(items))
 
-    def finding_paths(self, G):
+    def iterate_contigs(self):
+        """
+        Function yields (contig_name, KOs) for all contigs.
+        In streaming mode contigs are read chunk by chunk and their KOs are added to self.edges.
         """
-        Function sorts out all paths in the given graph. Moreover, for each found path calculating metrics M.
+        if self.input_chunks is None:
+            yield from self.dict_KO_by_contigs.items()
+            return
+        for chunk in self.input_chunks:
+            for contig, edges in chunk.items():
+                self.edges.update(edges)
+                yield contig, edges
+
+    def finding_paths(self, graph, presented):
+        """
+        Function finds the best path(s) in the given graph without enumerating all of them.
+        For each path metrics M is considered:
         M = weight_new_path / weigth_old_path --> min
-        :param G: graph
-        :return: paths_nodes - sequence of nodes that represents path (ex. [0 2 4 5 6 7 1])
-                 paths_labels - sequence of labels of items that represents path (ex. [K1 K3 K4 K0])
-                 weights - old weights of paths
-                 new_weights - new weights of paths
-                 indexes_min - list of indexes of paths with the smallest M
+        The smallest M is found with Dinkelbach iterations over one pass in topological order.
+        After that only prefixes of paths that can still reach the smallest M are kept,
+        grouped by their sums of weights, together with the index of the first of them in
+        order of full enumeration. That gives the same best path and the same M
+        as sorting out all paths.
+        Graph is not modified: weight_new is 0 for edges with labels from presented.
+        :param graph: compiled graph of module, edges are ordered by their end nodes
+        :param presented: set of ids of labels of edges that are presented
+        :return: labels - sequence of ids of labels that represents the first best path
+                 metric - M of that path
+                 number_of_paths - number of paths with the smallest M
         """
-        dict_nodes_paths, dict_of_paths_labels, dict_of_weights, dict_of_new_weights = [
-            {} for _ in range(4)
+        source, target, weight = graph.source, graph.target, graph.weight
+        weight_new = [
+            0 if label in presented else new_weight
+            for label, new_weight in zip(graph.label, graph.weight_new)
         ]
-        sorted_nodes = list(nx.topological_sort(G))
-        for node in sorted_nodes:
-            number_of_records = 0
-            (
-                dict_nodes_paths[node],
-                dict_of_paths_labels[node],
-                dict_of_weights[node],
-                dict_of_new_weights[node],
-            ) = [[], {}, {}, {}]
-            preds = G.pred[node]
-            if preds == {}:
-                dict_nodes_paths[node].append([node])
-                dict_of_paths_labels[node][0] = []
-                dict_of_weights[node][0] = 0
-                dict_of_new_weights[node][0] = 0
-                continue
-            for pred in preds.keys():  # ancestors of node: pred-->node
-                number_of_pred_ancestors = len(dict_of_paths_labels[pred])
-
-                for ancestor in preds[pred]:
-                    # for multi edge pred---A---->node
-                    #                      \____B____/
-                    for num in range(number_of_pred_ancestors):
-                        cur_labels = dict_of_paths_labels[pred][num]
-                        dict_of_paths_labels[node][number_of_records] = cur_labels + [
-                            preds[pred][ancestor]["label"]
-                        ]
-                        dict_of_weights[node][number_of_records] = (
-                            dict_of_weights[pred][num] + preds[pred][ancestor]["weight"]
-                        )
-                        dict_of_new_weights[node][number_of_records] = (
-                            dict_of_new_weights[pred][num]
-                            + preds[pred][ancestor]["weight_new"]
-                        )
-                        number_of_records += 1
-                    for cur_path in dict_nodes_paths[pred]:
-                        new_path = cur_path + [node]
-                        dict_nodes_paths[node].append(new_path)
-        paths_nodes, paths_labels = [dict_nodes_paths[1], dict_of_paths_labels[1]]
-        weights, new_weights = [dict_of_weights[1], dict_of_new_weights[1]]
-        metrics = []
-        for num in range(len(weights)):
-            metrics.append(1.0 * new_weights[num] / weights[num])
-        indexes_min = [
-            index for index in range(len(metrics)) if metrics[index] == min(metrics)
-        ]
-        return paths_nodes, paths_labels, metrics, indexes_min
-
-    def calculate_percentage(self, graph, dict_edges, unnecessary_nodes, edges):
+        number_of_nodes, edges = len(graph.node_ids), range(len(source))
+
+        def relax(ratio):
+            """Smallest new_weight - ratio * weight of prefixes ending in every node"""
+            best, best_edge = [0] * number_of_nodes, [None] * number_of_nodes
+            for num in edges:
+                node = target[num]
+                value = best[source[num]] + weight_new[num] - ratio * weight[num]
+                if best_edge[node] is None or value < best[node]:
+                    best[node], best_edge[node] = value, num
+            return best, best_edge
+
+        # Dinkelbach: min(new_weight - ratio * weight) == 0 only for the smallest ratio
+        ratio = 1.0
+        for _ in range(MAX_RATIO_ITERATIONS):
+            best, best_edge = relax(ratio)
+            weight_sum, new_weight_sum = 0, 0
+            node = graph.sink
+            while best_edge[node] is not None:
+                num = best_edge[node]
+                weight_sum += weight[num]
+                new_weight_sum += weight_new[num]
+                node = source[num]
+            candidate = 1.0 * new_weight_sum / weight_sum
+            if candidate >= ratio:
+                break
+            ratio = candidate
+        else:
+            # best has to match the last ratio, otherwise all prefixes are pruned below
+            logging.warning(
+                f"Search of the best path of {graph.name} not converged "
+                f"in {MAX_RATIO_ITERATIONS} iterations, ratio {ratio} is used"
+            )
+            best, _ = relax(ratio)
+
+        # prefixes with the same sums of weights are equivalent, keep the first one
+        number_of_paths, states = [0] * number_of_nodes, [None] * number_of_nodes
+        for node in graph.starts:
+            number_of_paths[node] = 1
+            states[node] = {(0, 0): [0, 1, None]}
+        for num in edges:
+            node, pred = target[num], source[num]
+            if states[node] is None:
+                states[node] = {}
+            offset = number_of_paths[node]
+            limit = best[node] + RATIO_TOLERANCE
+            for prefix, (index, count, _) in states[pred].items():
+                key = (prefix[0] + weight[num], prefix[1] + weight_new[num])
+                if key[1] - ratio * key[0] > limit:
+                    continue
+                if key not in states[node]:
+                    states[node][key] = [offset + index, count, (pred, prefix, num)]
+                else:
+                    states[node][key][1] += count
+            number_of_paths[node] += number_of_paths[pred]
+
+        sink_states = states[graph.sink]
+        metrics = {key: 1.0 * key[1] / key[0] for key in sink_states}
+        metric = min(metrics.values())
+        keys_min = [key for key in metrics if metrics[key] == metric]
+        key = min(keys_min, key=lambda k: sink_states[k][0])
+        labels, node = [], graph.sink
+        while states[node][key][2] is not None:
+            node, key, num = states[node][key][2]
+            labels.append(graph.label[num])
+        labels.reverse()
+        return labels, metric, sum(sink_states[k][1] for k in keys_min)
+
+    def calculate_percentage(self, graph, edges):
         """
         Function returns the percentage of matches of set of edges and graph.
         Example:
                 Pathway: A B C. Edges: A -> percentage = 33
-        :param graph: input graph of pathway
-        :param dict_edges: dict of edges in graph by labels
-        :param unnecessary_nodes: list of all nodes
+        :param graph: compiled graph of pathway
+        :param edges: set of ids of presented KOs, graph itself stays unchanged
         :return: percentage [0:100], number of paths, matching_list, missing_list of KOs
         """
-        # set weights_new as 0 for edges that are presented
-        for edge in edges:
-            if edge in dict_edges:
-                nodes = dict_edges[edge]
-                for cur_pair in nodes:
-                    start = cur_pair[0]
-                    finish = cur_pair[1]
-                    if len(graph[start][finish]) > 0:
-                        for num in range(len(graph[start][finish])):
-                            if graph[start][finish][num]["label"] == edge:
-                                index = num
-                                break
-                    else:
-                        index = 0
-                    # if graph[start][finish][index]['weight'] == 0:  # UNnecessary node
-                    #     graph[start][finish][index]['weight'] = 1
-                    graph[start][finish][index]["weight_new"] = 0
-
         # find the best path(s)
-        paths_nodes, paths_labels, metrics, indexes_min = self.finding_paths(graph)
-        """
-        metrics [N]: list of all sum_weight_new/sum_weight for all possible paths in graph
-        paths_nodes [N]: list of nodes that construct each path
-        paths_labels [N]: list of labels that construct each path
-        indexes_min [M<=N]: list of indexes that correspond to minimum value in metrict
-        """
-
-        # take random path from minimal, for example first
-        # because all paths in indexes_min have the same percentage. That means there is no difference which one to output
-        num = indexes_min[0]
-        percentage = round((1 - 1.0 * metrics[num]) * 100, 2)
-        matching_set, missing_set_necessary, missing_set = [set() for _ in range(3)]
+        # all paths with the smallest metrics have the same percentage,
+        # so it is enough to output the first of them
+        path_labels, metric, number_of_paths = self.finding_paths(graph, edges)
+        percentage = round((1 - 1.0 * metric) * 100, 2)
+        matching_set, missing_set_necessary = set(), set()
         if percentage > 0:
-            new_labels = paths_labels[num]
-            missing_labels = set(new_labels).difference(set(edges))
-            missing_set = missing_set.union(missing_labels)
-            missing_set_necessary = missing_set.difference(set(unnecessary_nodes))
-
-            existing_labels = set(new_labels).intersection(set(edges))
-            matching_set = matching_set.union(existing_labels)
+            new_labels = set(path_labels)
+            missing_set_necessary = new_labels.difference(edges).difference(
+                graph.unnecessary
+            )
+            matching_set = new_labels.intersection(edges)
         else:
             percentage = None
         return (
             percentage,
-            len(indexes_min),
-            list(matching_set),
-            list(missing_set_necessary),
+            number_of_paths,
+            [self.graphs.kos[KO] for KO in matching_set],
+            [self.graphs.kos[KO] for KO in missing_set_necessary],
         )
 
-    def sort_out_pathways(self, contig_name, file_out_summary, edges, graphs):
+    def _score_module(self, position, edges):
+        """
+        Function calculates percentage for module by its position in graphs.
+        It is called through LRU cache self.score_module,
+        so edges has to be a frozenset of presented KOs restricted to KOs of this module.
+        """
+        if self.profiler is None:
+            return self.calculate_percentage(
+                graph=self.graphs.module(position), edges=edges
+            )
+        start = time.perf_counter()
+        result = self.calculate_percentage(
+            graph=self.graphs.module(position), edges=edges
+        )
+        self.profiler.add_module_time(
+            self.graphs.modules[position], time.perf_counter() - start
+        )
+        return result
+
+    def sort_out_pathways(
+        self, contig_name, file_out_summary, edges, completeness=None
+    ):
         """
         Function sorts out all pathways and prints info about pathway that percentage of intersection more than 0
         :param
         contig_name == name of contig, or '' for full summary
         file_out_summary: output file
+        edges: list of KOs
+        completeness: optional dict to save percentage by pathway
         :return: -
         """
-        dict_sort_by_percentage, module_matching_kos = {}, {}
-        for name_pathway in graphs:
-            graph = graphs[name_pathway]
-            if intersection(graph[1], edges) == []:
-                continue
-            else:
-                (
-                    percentage,
+        dict_sort_by_percentage = {}
+        ko_ids = self.graphs.ko_ids
+        presented = {ko_ids[KO] for KO in edges if KO in ko_ids}
+        # modules are checked only if they have at least one presented KO
+        candidates = set()
+        for KO in presented:
+            candidates.update(self.graphs.modules_by_ko[KO])
+        # keep the order of graphs for modules with the same percentage
+        for position in sorted(candidates):
+            graph = self.graphs.module(position)
+            name_pathway = graph.name
+            (
+                percentage,
+                number_paths,
+                matching_labels,
+                missing_labels,
+            ) = self.score_module(position, frozenset(presented & graph.labels))
+            if percentage is not None:
+                if percentage not in dict_sort_by_percentage:
+                    dict_sort_by_percentage[percentage] = {}
+                dict_sort_by_percentage[percentage][name_pathway] = [
                     number_paths,
                     matching_labels,
                     missing_labels,
-                ) = self.calculate_percentage(
-                    graph=graph[0],
-                    dict_edges=graph[1],
-                    unnecessary_nodes=graph[2],
-                    edges=edges,
-                )
-                if percentage is not None:
-                    if percentage not in dict_sort_by_percentage:
-                        dict_sort_by_percentage[percentage] = {}
-                    dict_sort_by_percentage[percentage][name_pathway] = [
-                        number_paths,
-                        matching_labels,
-                        missing_labels,
-                    ]
+                ]
+        return self.write_pathways(
+            contig_name, file_out_summary, dict_sort_by_percentage, completeness
+        )
+
+    def write_contigs(self, contigs, file_out_summary):
+        """
+        Function scores list of contigs and writes them in the same order.
+        :param contigs: list of (contig_name, KOs)
+        :param file_out_summary: output file
+        """
+        for contig, edges in contigs:
+            self.sort_out_pathways(
+                contig_name=contig,
+                file_out_summary=file_out_summary,
+                edges=edges,
+            )
 
+    def write_pathways(
+        self, contig_name, file_out_summary, dict_sort_by_percentage, completeness=None
+    ):
+        """
+        Function prints pathways sorted by percentage, pathways with the same percentage keep their order.
+        :param contig_name: name of contig, or '' for full summary
+        :param file_out_summary: output file
+        :param dict_sort_by_percentage: {percentage: {pathway: [number_paths, matching, missing]}}
+        :param completeness: optional dict to save percentage by pathway
+        :return: dict of matching KOs by pathway
+        """
+        module_matching_kos = {}
         # output Summary
         for percentage in sorted(list(dict_sort_by_percentage.keys()), reverse=True):
             # file_out_summary.write('**********************************************\nPercentage = ' + str(percentage) + '\n')
@@ -317,6 +401,8 @@ class CompletenessCalculator:
                 else:
                     out_name_pathway = name_pathway
                 module_matching_kos[name_pathway] = matching_current
+                if completeness is not None:
+                    completeness[name_pathway] = percentage
                 output_line = "\t".join(
                     [
                         out_name_pathway,
@@ -360,20 +446,17 @@ class CompletenessCalculator:
         """
         For each graph functions returns dict of weights by KOs,
         ex. dict_graphKO: { pathway1: {KO1: weight1, KO2: weight2}, pathway2: {...} }
-        :param graphs: dict of graphs
+        :param graphs: compiled graphs
         :return: dict of pathways with weights for each KO
         """
         dict_graphKO = {}
-        for name_pathway in graphs:
-            graph = graphs[name_pathway]
+        for position, name_pathway in enumerate(graphs):
+            graph = graphs.module(position)
             dict_graphKO[name_pathway] = {}
-
-            for start in graph[0]._adj:
-                for finish in graph[0]._adj[start]:
-                    for num in graph[0]._adj[start][finish]:
-                        KO = graph[0]._adj[start][finish][num]["label"]
-                        weight = round(graph[0]._adj[start][finish][num]["weight"], 2)
-                        dict_graphKO[name_pathway][KO] = weight
+            # the same order of edges as in networkx adjacency
+            for num in sorted(range(len(graph.rank)), key=graph.rank.__getitem__):
+                KO = graphs.kos[graph.label[num]]
+                dict_graphKO[name_pathway][KO] = round(graph.weight[num], 2)
         logging.info("weights done")
         return dict_graphKO
 
@@ -381,14 +464,13 @@ class CompletenessCalculator:
         # COMMON INFO
         logger = logging.getLogger(__name__)
         logger.info("Generating completeness for whole list of KOs...")
-        using_graphs = copy.deepcopy(self.graphs)
-        with open(self.name_common_output_summary, "wt") as file_out_summary:
+        with open_file(self.name_common_output_summary, "w") as file_out_summary:
             self.set_headers(file_out_summary, contig=False)
             module_matching_kos = self.sort_out_pathways(
                 contig_name="",
                 file_out_summary=file_out_summary,
                 edges=self.edges,
-                graphs=using_graphs,
+                completeness=self.modules_completeness,
             )
         logger.info("...Done")
         return module_matching_kos
@@ -396,41 +478,141 @@ class CompletenessCalculator:
     def generate_per_contig_summary(self):
         logger = logging.getLogger(__name__)
         logger.info("Generating completeness for contigs...")
-        with open(self.name_contigs_output_summary, "wt") as file_out_summary:
+        with open_file(self.name_contigs_output_summary, "w") as file_out_summary:
             self.set_headers(file_out_summary, contig=True)
-            for contig in self.dict_KO_by_contigs:
-                using_graphs = copy.deepcopy(self.graphs)
-                edges = self.dict_KO_by_contigs[contig]
-                self.sort_out_pathways(
-                    contig_name=contig,
-                    file_out_summary=file_out_summary,
-                    edges=edges,
-                    graphs=using_graphs,
-                )
+            if self.threads > 1:
+                self.generate_per_contig_summary_parallel(file_out_summary)
+            else:
+                for contig, edges in self.iterate_contigs():
+                    self.sort_out_pathways(
+                        contig_name=contig,
+                        file_out_summary=file_out_summary,
+                        edges=edges,
+                    )
         logger.info("...Done")
 
+    def generate_per_contig_summary_parallel(self, file_out_summary):
+        """
+        Function scores chunks of contigs in worker processes.
+        Results are written as soon as all previous chunks are written,
+        so the order of contigs is the same as in single process mode.
+        :param file_out_summary: output file with header
+        :return: -
+        """
+        logging.info(f"Using {self.threads} worker processes")
+        worker_settings = {
+            "outdir": self.outdir,
+            "outprefix": self.outprefix,
+            "include_weights": self.include_weights,
+            "plot_pathways": False,
+            "per_contig": False,
+            "modules_names": dict(self.modules_names),
+            "modules_classes": dict(self.modules_classes),
+            "cache_size": self.cache_size,
+            "profiler": Profiler() if self.profiler is not None else None,
+        }
+        contigs = self.iterate_contigs()
+        chunks = iter(lambda: list(itertools.islice(contigs, CONTIGS_PER_TASK)), [])
+        with ProcessPoolExecutor(
+            max_workers=self.threads,
+            initializer=init_worker,
+            initargs=(self.graphs_filename, worker_settings),
+        ) as executor:
+            pending = collections.deque()
+            for chunk in chunks:
+                pending.append(executor.submit(score_contigs, chunk))
+                if len(pending) >= self.threads * PENDING_TASKS_PER_THREAD:
+                    self.write_scored_contigs(pending.popleft(), file_out_summary)
+            while pending:
+                self.write_scored_contigs(pending.popleft(), file_out_summary)
+
+    def write_scored_contigs(self, future, file_out_summary):
+        lines, hits, misses, modules_times = future.result()
+        file_out_summary.write(lines)
+        self.workers_cache_hits += hits
+        self.workers_cache_misses += misses
+        if modules_times:
+            self.profiler.merge_modules(modules_times)
+
     def process(self):
         logger = logging.getLogger(__name__)
+        streaming = self.input_chunks is not None
+        if streaming:
+            # KOs of all contigs are known only after the whole input is read
+            if self.per_contig:
+                with stage(self.profiler, "per_contig_summary"):
+                    self.generate_per_contig_summary()
+            else:
+                with stage(self.profiler, "input_parsing"):
+                    for _ in self.iterate_contigs():
+                        pass
         # summary for all contigs
-        module_matching_kos = self.generate_common_summary()
+        with stage(self.profiler, "common_summary"):
+            module_matching_kos = self.generate_common_summary()
         # plot
         if self.plot_pathways:
             logger.info("Plot pathways images")
-            plot_completeness_generator = PlotModuleCompletenessGraph(
-                modules_completeness=module_matching_kos,
-                graphs=self.graphs,
-                modules_definitions=self.modules_definitions,
-                outdir=self.name_output_pathways_plots,
-            )
-            plot_completeness_generator.generate_plot()
+            with stage(self.profiler, "plotting"):
+                # plotting backends are heavy, they are imported only when needed
+                from .plot_modules_graphs import PlotModuleCompletenessGraph
+
+                plot_completeness_generator = PlotModuleCompletenessGraph(
+                    modules_completeness=module_matching_kos,
+                    graphs=self.graphs.to_networkx(module_matching_kos),
+                    modules_definitions=self.modules_definitions,
+                    outdir=self.name_output_pathways_plots,
+                )
+                plot_completeness_generator.generate_plot()
             logger.info("...Done. Results are in pathways_plots folder")
 
         # generate summary per-contig
-        if self.per_contig:
-            self.generate_per_contig_summary()
+        if self.per_contig and not streaming:
+            with stage(self.profiler, "per_contig_summary"):
+                self.generate_per_contig_summary()
+        cache_info = self.score_module.cache_info()
+        hits = cache_info.hits + self.workers_cache_hits
+        misses = cache_info.misses + self.workers_cache_misses
+        logger.info(f"Modules scores cache: {hits} hits, {misses} misses")
+        if self.profiler is not None:
+            profile_filename = self.name_output + PROFILE_SUFFIX
+            self.profiler.save(profile_filename, cache={"hits": hits, "misses": misses})
+            logger.info(f"Profile saved to {profile_filename}")
         logger.info("Bye!")
 
 
+def init_worker(graphs_filename, settings):
+    """
+    Initializer of worker process: graphs are loaded once per process.
+    :param graphs_filename: graphs in compiled or pickle format
+    :param settings: arguments for CompletenessCalculator
+    """
+    global _worker_calculator
+    _worker_calculator = CompletenessCalculator(
+        input_KOs={}, graphs=load_graphs(graphs_filename), **settings
+    )
+
+
+def score_contigs(contigs):
+    """
+    Function scores contigs in worker process.
+    :param contigs: list of (contig_name, KOs)
+    :return: output lines for contigs, cache hits and misses of this call,
+             times of modules of this call (None if profiling is disabled)
+    """
+    cache_before = _worker_calculator.score_module.cache_info()
+    with io.StringIO() as lines:
+        _worker_calculator.write_contigs(contigs, lines)
+        output = lines.getvalue()
+    cache_after = _worker_calculator.score_module.cache_info()
+    profiler = _worker_calculator.profiler
+    return (
+        output,
+        cache_after.hits - cache_before.hits,
+        cache_after.misses - cache_before.misses,
+        profiler.pop_modules() if profiler is not None else None,
+    )
+
+
 def get_kos_dict(input_table, input_list, list_separator):
     """
     Function creates a list of items that were found by HMMScan
@@ -443,7 +625,7 @@ def get_kos_dict(input_table, input_list, list_separator):
     dict_KO_by_contigs = {}
     if input_table:
         if os.path.exists(input_table):
-            with open(input_table, "r") as file_in:
+            with open_file(input_table, "r") as file_in:
                 for line in file_in:
                     line = line.strip().split("\t")
                     name = line[0]
@@ -456,7 +638,7 @@ def get_kos_dict(input_table, input_list, list_separator):
     elif input_list:
         if os.path.exists(input_list):
             name = os.path.basename(input_list)
-            with open(input_list, "r") as f:
+            with open_file(input_list, "r") as f:
                 list_kos = f.read().strip().split(list_separator)
                 if len(list_kos) == 0:
                     logging.error(f"No KOs found in {input_list}")
@@ -471,6 +653,68 @@ def get_kos_dict(input_table, input_list, list_separator):
     return dict_KO_by_contigs
 
 
+def read_kos_chunks(input_table, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Function reads file with contigs and their KEGG annotations by chunks.
+    Lines of the same contig have to follow each other to be merged.
+    :param input_table: file with contigs and their KEGG annotations
+    :param chunk_size: number of contigs in chunk
+    :return: generator of { contig_name1: [KO1, KO2,...], contig_name2: [...], ...}
+    """
+    chunk, name = {}, None
+    with open_file(input_table, "r") as file_in:
+        for line in file_in:
+            line = line.strip().split("\t")
+            if line[0] != name and len(chunk) == chunk_size:
+                yield chunk
+                chunk = {}
+            name = line[0]
+            if name not in chunk:
+                chunk[name] = []
+            chunk[name] += line[1:]
+    if chunk:
+        yield chunk
+
+
+def load_modules_library(graphs=None, modules_table=None):
+    """
+    Function loads graphs and modules information (packaged files by default).
+    Modules information saved in compiled graphs is used if table is not provided.
+    :param graphs: graphs in compiled (.kgc) or pickle format
+    :param modules_table: modules table in TSV format
+    :return: graphs filename, graphs, (modules_definitions, modules_names, modules_classes)
+    """
+    logger = logging.getLogger(__name__)
+    # Get graphs file
+    graphs_filename = (
+        graphs
+        if graphs
+        else files("kegg_pathways_completeness.pathways_data").joinpath("graphs.kgc")
+    )
+
+    modules_graphs = load_graphs(graphs_filename)
+    if modules_graphs is None:
+        sys.exit(1)
+
+    # Modules information saved in compiled graphs is used if table is not provided
+    modules_info = None if modules_table else modules_graphs.get_modules_info()
+    if modules_info:
+        logger.info(f"Using modules data from graphs: {graphs_filename}")
+    else:
+        # Get modules table file
+        modules_table_filename = (
+            modules_table
+            if modules_table
+            else files("kegg_pathways_completeness.pathways_data").joinpath(
+                "modules_table.tsv"
+            )
+        )
+        # Load modules information from TSV
+        logger.info(f"Loading modules data from TSV: {modules_table_filename}")
+        modules_info = parse_modules_table_tsv(modules_table_filename)
+    return graphs_filename, modules_graphs, modules_info
+
+
 @click.command()
 @click.option(
     "-i",
@@ -497,13 +741,13 @@ def get_kos_dict(input_table, input_list, list_separator):
     "-g",
     "--graphs",
     type=click.Path(exists=True),
-    help="Graphs in pickle format (default: uses packaged graphs.pkl)",
+    help="Graphs in compiled (.kgc) or pickle format (default: uses packaged graphs.kgc)",
 )
 @click.option(
     "-t",
     "--modules-table",
     type=click.Path(exists=True),
-    help="Modules table in TSV format (default: uses packaged modules_table.tsv)",
+    help="Modules table in TSV format (default: uses data saved in compiled graphs or packaged modules_table.tsv)",
 )
 @click.option(
     "-o",
@@ -538,6 +782,45 @@ def get_kos_dict(input_table, input_list, list_separator):
     is_flag=True,
     help="Create per-contig summary table (does not work with --input-list)",
 )
+@click.option(
+    "--cache-size",
+    type=click.IntRange(min=0),
+    default=DEFAULT_CACHE_SIZE,
+    help="Number of module scores to keep for reuse between contigs with the same KOs of module (0 disables cache)",
+    show_default=True,
+)
+@click.option(
+    "-j",
+    "--threads",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Number of worker processes for per-contig summary",
+    show_default=True,
+)
+@click.option(
+    "--streaming",
+    is_flag=True,
+    help="Read --input by chunks of contigs instead of loading the whole table (lines of contig have to be consecutive)",
+)
+@click.option(
+    "--chunk-size",
+    type=click.IntRange(min=1),
+    default=DEFAULT_CHUNK_SIZE,
+    help="Number of contigs in chunk for --streaming",
+    show_default=True,
+)
+@click.option(
+    "-z",
+    "--compress",
+    "compression",
+    type=click.Choice(COMPRESSIONS),
+    help="Compress output tables (.gz or .zst is added to their names)",
+)
+@click.option(
+    "--profile",
+    is_flag=True,
+    help=f"Save wall time of stages, scoring time of modules and peak memory to <outprefix>{PROFILE_SUFFIX}",
+)
 @click.option(
     "-v",
     "--verbose",
@@ -556,6 +839,12 @@ def main(
     include_weights,
     plot_pathways,
     per_contig,
+    cache_size,
+    threads,
+    streaming,
+    chunk_size,
+    compression,
+    profile,
     verbose,
 ):
     """
@@ -571,54 +860,53 @@ def main(
     - Use -t/--modules-table for modules data in TSV format (required)
     """
     setup_logging(verbose)
-    logger = logging.getLogger(__name__)
 
     # Validate mutually exclusive inputs
     if not input_file and not input_list:
         raise click.UsageError("Must provide either --input or --input-list")
     if input_file and input_list:
         raise click.UsageError("Cannot use both --input and --input-list")
+    if streaming and not input_file:
+        raise click.UsageError("--streaming works only with --input")
+    profiler = Profiler() if profile else None
 
     # Parse input with KOs
-    dict_KO_by_contigs = get_kos_dict(
-        input_table=input_file,
-        input_list=input_list,
-        list_separator=list_separator,
-    )
-
-    # Get graphs file
-    graphs_filename = (
-        graphs
-        if graphs
-        else files("kegg_pathways_completeness.pathways_data").joinpath("graphs.pkl")
-    )
+    if streaming:
+        # input is read together with per-contig summary (or common summary)
+        dict_KO_by_contigs = {}
+        input_chunks = read_kos_chunks(input_file, chunk_size)
+    else:
+        with stage(profiler, "input_parsing"):
+            dict_KO_by_contigs = get_kos_dict(
+                input_table=input_file,
+                input_list=input_list,
+                list_separator=list_separator,
+            )
+        input_chunks = None
 
-    # Get modules table file
-    modules_table_filename = (
-        modules_table
-        if modules_table
-        else files("kegg_pathways_completeness.pathways_data").joinpath(
-            "modules_table.tsv"
+    with stage(profiler, "graphs_loading"):
+        graphs_filename, modules_graphs, modules_info = load_modules_library(
+            graphs=graphs, modules_table=modules_table
         )
-    )
-
-    # Load modules information from TSV
-    logger.info(f"Loading modules data from TSV: {modules_table_filename}")
-    modules_definitions, modules_names, modules_classes = parse_modules_table_tsv(
-        modules_table_filename
-    )
+    modules_definitions, modules_names, modules_classes = modules_info
 
     completeness_calculator = CompletenessCalculator(
         input_KOs=dict_KO_by_contigs,
         outdir=outdir,
         outprefix=outprefix,
-        graphs=parse_graphs_input(graphs_filename),
+        graphs=modules_graphs,
         modules_names=modules_names,
         modules_classes=modules_classes,
         modules_definitions=modules_definitions,
         include_weights=include_weights,
         plot_pathways=plot_pathways,
         per_contig=per_contig,
+        cache_size=cache_size,
+        threads=threads,
+        graphs_filename=graphs_filename,
+        input_chunks=input_chunks,
+        compression=compression,
+        profiler=profiler,
     )
 
     completeness_calculator.process()
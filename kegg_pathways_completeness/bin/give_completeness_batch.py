@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright 2026 EMBL - European Bioinformatics Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import logging
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import click
+
+from .give_completeness import (
+    COMPRESSIONS,
+    DEFAULT_CACHE_SIZE,
+    CompletenessCalculator,
+    get_kos_dict,
+    load_modules_library,
+)
+from .utils import get_version, open_file, setup_logging
+
+INPUT_FORMATS = ["table", "list"]
+# matrix and its labels are separate .npy files, so they can be memory-mapped
+MATRIX_SUFFIX = "_matrix.npy"
+SAMPLES_SUFFIX = "_matrix_samples.npy"
+MODULES_SUFFIX = "_matrix_modules.npy"
+
+# graphs and modules information of process, loaded once by load_library
+_library = None
+
+
+def parse_manifest(manifest):
+    """
+    Function reads manifest of samples.
+    Each line = sample_id\\tinput_file[\\tformat], format is "table" (default) or "list".
+    Relative paths are resolved against directory of manifest, lines starting with # are skipped.
+    :param manifest: manifest file
+    :return: list of (sample_id, input_file, format)
+    """
+    samples, seen = [], set()
+    manifest_dir = os.path.dirname(os.path.abspath(manifest))
+    with open_file(manifest, "r") as file_in:
+        for line in file_in:
+            if not line.strip() or line.startswith("#"):
+                continue
+            line = line.rstrip("\n").split("\t")
+            if len(line) < 2:
+                raise click.UsageError(f"No input file for sample {line[0]}")
+            sample, input_file = line[0], os.path.join(manifest_dir, line[1])
+            input_format = line[2] if len(line) > 2 and line[2] else "table"
+            if input_format not in INPUT_FORMATS:
+                raise click.UsageError(
+                    f"Unknown format {input_format} for sample {sample}"
+                )
+            if sample in seen:
+                raise click.UsageError(f"Sample {sample} is duplicated in manifest")
+            if not os.path.exists(input_file):
+                raise click.UsageError(f"No file {input_file} for sample {sample}")
+            seen.add(sample)
+            samples.append((sample, input_file, input_format))
+    return samples
+
+
+def load_library(graphs, modules_table, settings):
+    """
+    Function loads graphs and modules information for all samples of the process,
+    it is also the initializer of worker processes.
+    :param graphs: graphs in compiled (.kgc) or pickle format
+    :param modules_table: modules table in TSV format
+    :param settings: arguments for CompletenessCalculator shared by samples
+    """
+    global _library
+    _, modules_graphs, modules_info = load_modules_library(
+        graphs=graphs, modules_table=modules_table
+    )
+    _library = (modules_graphs, modules_info, settings)
+
+
+def get_library_modules():
+    """Function returns modules of loaded graphs in their order (columns of completeness matrix)."""
+    return list(_library[0].modules)
+
+
+def score_sample(sample, input_file, input_format, outdir):
+    """
+    Function calculates completeness of sample with loaded library.
+    :param sample: sample_id used as prefix of output files
+    :param input_file: table with contigs and KOs or list of KOs
+    :param input_format: table or list
+    :param outdir: output directory
+    :return: sample_id, dict of completeness by module
+    """
+    modules_graphs, modules_info, settings = _library
+    modules_definitions, modules_names, modules_classes = modules_info
+    dict_KO_by_contigs = get_kos_dict(
+        input_table=input_file if input_format == "table" else None,
+        input_list=input_file if input_format == "list" else None,
+        list_separator=settings["list_separator"],
+    )
+    completeness_calculator = CompletenessCalculator(
+        input_KOs=dict_KO_by_contigs,
+        outdir=outdir,
+        outprefix=sample,
+        graphs=modules_graphs,
+        modules_names=modules_names,
+        modules_classes=modules_classes,
+        modules_definitions=modules_definitions,
+        include_weights=settings["include_weights"],
+        plot_pathways=False,
+        per_contig=settings["per_contig"] and input_format == "table",
+        cache_size=settings["cache_size"],
+        compression=settings["compression"],
+    )
+    completeness_calculator.process()
+    return sample, completeness_calculator.modules_completeness
+
+
+def merge_sample_tables(samples, sample_outdir, suffix, output_file):
+    """
+    Function joins per-sample tables into long table with sample column.
+    Samples without table (ex. no per-contig table for list of KOs) are skipped.
+    :param samples: list of sample_ids in output order
+    :param sample_outdir: directory with per-sample tables
+    :param suffix: suffix of per-sample tables (ex. _pathways.tsv)
+    :param output_file: long table
+    """
+    header_written = False
+    with open_file(output_file, "w") as file_out:
+        for sample in samples:
+            sample_table = os.path.join(sample_outdir, sample + suffix)
+            if not os.path.exists(sample_table):
+                continue
+            with open_file(sample_table, "r") as file_in:
+                header = file_in.readline()
+                if not header_written:
+                    file_out.write("sample\t" + header)
+                    header_written = True
+                for line in file_in:
+                    file_out.write(sample + "\t" + line)
+
+
+def save_completeness_matrix(prefix, samples, modules, samples_completeness):
+    """
+    Function saves dense sample x module completeness matrix into .npy files:
+    <prefix>_matrix.npy (float64, samples x modules, 0 for modules that are not found),
+    <prefix>_matrix_samples.npy and <prefix>_matrix_modules.npy (unicode arrays with index of rows and columns).
+    Files are plain .npy, so np.load(..., mmap_mode="r") reads them without copying.
+    :param prefix: output prefix with directory
+    :param samples: list of sample_ids (rows)
+    :param modules: list of modules (columns)
+    :param samples_completeness: dict of {module: percentage} by sample
+    """
+    import numpy as np
+
+    columns = {module: num for num, module in enumerate(modules)}
+    # rows are filled directly in the output file
+    matrix = np.lib.format.open_memmap(
+        prefix + MATRIX_SUFFIX,
+        mode="w+",
+        dtype=np.float64,
+        shape=(len(samples), len(modules)),
+    )
+    for row, sample in enumerate(samples):
+        for module, percentage in samples_completeness[sample].items():
+            matrix[row, columns[module]] = percentage
+    matrix.flush()
+    del matrix
+    np.save(prefix + SAMPLES_SUFFIX, np.array(samples, dtype=str))
+    np.save(prefix + MODULES_SUFFIX, np.array(modules, dtype=str))
+
+
+@click.command()
+@click.option(
+    "-i",
+    "--manifest",
+    type=click.Path(exists=True),
+    required=True,
+    help="Samples manifest (each line = sample_id\\tinput_file[\\ttable|list])",
+)
+@click.option(
+    "-s",
+    "--list-separator",
+    default=",",
+    help="Separator for samples in list format",
+    show_default=True,
+)
+@click.option(
+    "-g",
+    "--graphs",
+    type=click.Path(exists=True),
+    help="Graphs in compiled (.kgc) or pickle format (default: uses packaged graphs.kgc)",
+)
+@click.option(
+    "-t",
+    "--modules-table",
+    type=click.Path(exists=True),
+    help="Modules table in TSV format (default: uses data saved in compiled graphs or packaged modules_table.tsv)",
+)
+@click.option(
+    "-o",
+    "--outdir",
+    default=".",
+    help="Output directory",
+    show_default=True,
+)
+@click.option(
+    "-r",
+    "--outprefix",
+    default="summary.kegg",
+    help="Prefix for long tables (--long-table) and matrix (--matrix)",
+    show_default=True,
+)
+@click.option(
+    "-w",
+    "--include-weights",
+    is_flag=True,
+    help="Add weights for each KO in output",
+)
+@click.option(
+    "-m",
+    "--add-per-contig",
+    "per_contig",
+    is_flag=True,
+    help="Create per-contig summary tables (only for samples in table format)",
+)
+@click.option(
+    "--long-table",
+    is_flag=True,
+    help="Write one table for all samples with sample column instead of per-sample tables",
+)
+@click.option(
+    "--matrix",
+    is_flag=True,
+    help=f"Write sample x module completeness matrix to <outprefix>{MATRIX_SUFFIX} with labels of rows in <outprefix>{SAMPLES_SUFFIX} and columns in <outprefix>{MODULES_SUFFIX}",
+)
+@click.option(
+    "--cache-size",
+    type=click.IntRange(min=0),
+    default=DEFAULT_CACHE_SIZE,
+    help="Number of module scores to keep for reuse between contigs with the same KOs of module (0 disables cache)",
+    show_default=True,
+)
+@click.option(
+    "-j",
+    "--threads",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Number of worker processes for samples",
+    show_default=True,
+)
+@click.option(
+    "-z",
+    "--compress",
+    "compression",
+    type=click.Choice(COMPRESSIONS),
+    help="Compress output tables (.gz or .zst is added to their names)",
+)
+@click.option(
+    "-v",
+    "--verbose",
+    is_flag=True,
+    help="Enable verbose logging",
+)
+@click.version_option(version=get_version(), prog_name="give_completeness_batch")
+def main(
+    manifest,
+    list_separator,
+    graphs,
+    modules_table,
+    outdir,
+    outprefix,
+    include_weights,
+    per_contig,
+    long_table,
+    matrix,
+    cache_size,
+    threads,
+    compression,
+    verbose,
+):
+    """
+    Calculate KEGG pathway completeness for many samples with graphs and modules data loaded once.
+
+    Per-sample outputs are named by sample_id (<sample_id>_pathways.tsv),
+    with --long-table all samples are written to <outprefix>_pathways.tsv with sample column.
+    With --matrix completeness of all samples is saved as NumPy arrays to <outprefix>_matrix.npy
+    (samples in <outprefix>_matrix_samples.npy, modules in <outprefix>_matrix_modules.npy),
+    they can be loaded with np.load(..., mmap_mode="r") without reading the whole matrix.
+    """
+    setup_logging(verbose)
+    logger = logging.getLogger(__name__)
+
+    samples = parse_manifest(manifest)
+    logger.info(f"{len(samples)} samples in manifest")
+    if not os.path.exists(outdir):
+        os.makedirs(outdir)
+    # per-sample tables for long table are written to temporary directory
+    sample_outdir = tempfile.mkdtemp(dir=outdir) if long_table else outdir
+
+    settings = {
+        "list_separator": list_separator,
+        "include_weights": include_weights,
+        "per_contig": per_contig,
+        "cache_size": cache_size,
+        "compression": compression,
+    }
+    sample_ids, input_files, input_formats = zip(*samples) if samples else ([], [], [])
+    outdirs = [sample_outdir] * len(samples)
+    samples_completeness, modules = {}, []
+    try:
+        # with worker processes graphs are loaded only by workers
+        # (pickled graphs are not memory-mapped), modules for matrix are taken from one of them
+        if threads > 1:
+            with ProcessPoolExecutor(
+                max_workers=threads,
+                initializer=load_library,
+                initargs=(graphs, modules_table, settings),
+            ) as executor:
+                if matrix:
+                    modules = executor.submit(get_library_modules).result()
+                for sample, completeness in executor.map(
+                    score_sample, sample_ids, input_files, input_formats, outdirs
+                ):
+                    samples_completeness[sample] = completeness
+                    logger.info(f"Sample {sample} done")
+        else:
+            load_library(graphs, modules_table, settings)
+            modules = get_library_modules()
+            for sample, completeness in map(
+                score_sample, sample_ids, input_files, input_formats, outdirs
+            ):
+                samples_completeness[sample] = completeness
+                logger.info(f"Sample {sample} done")
+
+        if matrix:
+            save_completeness_matrix(
+                prefix=os.path.join(outdir, outprefix),
+                samples=list(sample_ids),
+                modules=modules,
+                samples_completeness=samples_completeness,
+            )
+
+        if long_table:
+            suffix = ".with_weights.tsv" if include_weights else ".tsv"
+            if compression:
+                suffix += "." + compression
+            for table in ["_pathways", "_contigs"]:
+                if table == "_contigs" and not per_contig:
+                    continue
+                merge_sample_tables(
+                    samples=sample_ids,
+                    sample_outdir=sample_outdir,
+                    suffix=table + suffix,
+                    output_file=os.path.join(outdir, outprefix + table + suffix),
+                )
+    finally:
+        if long_table:
+            shutil.rmtree(sample_outdir)
+    logger.info("Bye!")
+
+
+if __name__ == "__main__":
+    main()
@@ -15,16 +15,34 @@
 # limitations under the License.
 
 
+import hashlib
 import logging
 import os
 import pickle
-import time
+from concurrent.futures import ProcessPoolExecutor
 
 import click
 import networkx as nx
 import numpy as np
 
-from .utils import get_version, setup_logging
+from .compiled_graphs import compile_graphs
+from .definition_parser import parse_definition
+from .utils import get_version, parse_modules_table_tsv, setup_logging
+
+# modules sent to worker process at once
+MODULES_PER_TASK = 16
+
+# generator of worker process, set by init_worker
+_worker_generator = None
+
+
+def get_definition_hash(definition):
+    """
+    Function returns hash of module definition saved in graph attribute "definition_hash".
+    :param definition: definition of module
+    :return: sha256 hex digest
+    """
+    return hashlib.sha256(definition.encode("utf-8")).hexdigest()
 
 
 class GraphsGenerator:
@@ -34,23 +52,30 @@ class GraphsGenerator:
         output_dir: str,
         existing_graphs_file: str = None,
         changed_file: str = None,
+        threads: int = 1,
     ):
         """
         Creates Graphs in network format for each module in input_file.
-        Graphs object is saved into graphs.pkl file.
+        Graphs object is saved into graphs.pkl file,
+        compiled version for give_completeness is saved into graphs.kgc file
+        (together with names and classes of modules for TSV input).
 
         Can perform incremental updates by reusing existing graphs and only
-        regenerating changed modules.
+        regenerating changed modules. Every graph keeps hash of its definition
+        (graph attribute "definition_hash"), so without changed_file existing graphs
+        of modules with the same definition are reused.
 
         :param input_file: Line separated file with modules in format module:KOs
         :param output_dir: name of output directory
         :param existing_graphs_file: Path to existing graphs.pkl to reuse unchanged graphs
         :param changed_file: Path to changed.tsv with modules that need regeneration
+        :param threads: number of worker processes for graphs generation
         """
         self.input_file = input_file
         self.output_dir = output_dir
         self.existing_graphs_file = existing_graphs_file
         self.changed_file = changed_file
+        self.threads = threads
         if not os.path.exists(self.output_dir):
             os.mkdir(self.output_dir)
 
@@ -314,6 +339,178 @@ class GraphsGenerator:
             dict_edges[expression].append([start_node, end_node])
             return G, dict_edges, unnecessary_nodes
 
+    def build_graph(
+        self,
+        G,
+        dict_edges,
+        unnecessary_nodes,
+        pathway,
+        tree,
+        start_node,
+        end_node,
+        weight,
+    ):
+        """
+        Function adds edges of parsed definition to graph G.
+        Nodes and edges are added in the same order and with the same weights as by recursive_parsing.
+
+        :param pathway: definition of module, labels of edges are taken from it
+        :param tree: tree of expression from parse_definition
+        :param start_node: num of node from which expression sequence would be started
+        :param end_node: num of node to which expression sequence would be finished
+        :param weight: weight of edge (0 for unnecessary edges, 1 - for necessary, float - for parts of complex)
+        :return: graph, dict of edges, unnecessary nodes
+        """
+        kind = tree[0]
+        if kind == "--":
+            name_missing = "K00000"
+            G.add_edge(
+                start_node,
+                end_node,
+                label=name_missing,
+                weight=0,
+                weight_new=0,
+                name="-",
+            )
+            unnecessary_nodes.append(name_missing)
+            if name_missing not in dict_edges:
+                dict_edges[name_missing] = []
+            dict_edges[name_missing].append([start_node, end_node])
+        elif kind == "-KO":
+            # label is sliced for every use as in recursive_parsing, so pickled graphs are the same
+            _, start, end = tree
+            G.add_edge(
+                start_node,
+                end_node,
+                label=pathway[start:end],
+                weight=0,
+                weight_new=0,
+                name="-",
+            )
+            unnecessary_nodes.append(pathway[start:end])
+            if pathway[start:end] not in dict_edges:
+                dict_edges[pathway[start:end]] = []
+            dict_edges[pathway[start:end]].append([start_node, end_node])
+        elif kind == "KO":
+            expression = pathway[tree[1]: tree[2]]
+            if weight == 0:
+                G.add_edge(
+                    start_node,
+                    end_node,
+                    label=expression,
+                    weight=weight,
+                    weight_new=weight,
+                    name="-",
+                )
+                unnecessary_nodes.append(expression)
+            else:
+                G.add_edge(
+                    start_node,
+                    end_node,
+                    label=expression,
+                    weight=weight,
+                    weight_new=weight,
+                    name="node",
+                )
+            if expression not in dict_edges:
+                dict_edges[expression] = []
+            dict_edges[expression].append([start_node, end_node])
+        elif kind == ",":
+            for child in tree[1]:
+                self.build_graph(
+                    G,
+                    dict_edges,
+                    unnecessary_nodes,
+                    pathway,
+                    child,
+                    start_node,
+                    end_node,
+                    weight,
+                )
+        else:
+            # ' ', '+' and '-': chain of parts between new nodes
+            children = tree[1]
+            if kind != "-":
+                weight = weight / len(children)
+            cur_start_node = start_node
+            for num, child in enumerate(children):
+                if num == len(children) - 1:
+                    cur_end_node = end_node
+                else:
+                    # G.nodes is cached in graph as by recursive_parsing
+                    cur_end_node = len(G.nodes)
+                    G.add_node(cur_end_node)
+                self.build_graph(
+                    G,
+                    dict_edges,
+                    unnecessary_nodes,
+                    pathway,
+                    child,
+                    cur_start_node,
+                    cur_end_node,
+                    0 if kind == "-" and num > 0 else weight,
+                )
+                cur_start_node = cur_end_node
+        return G, dict_edges, unnecessary_nodes
+
+    def make_graph(self, pathway):
+        """
+        Function creates graph of one module.
+        Definition is parsed in one pass with parse_definition,
+        definitions it does not accept are parsed by recursive_parsing.
+        :param pathway: definition of module
+        :return: graph, dict of edges, unnecessary nodes
+        """
+        # Graph creation:
+        Graph = nx.MultiDiGraph(definition_hash=get_definition_hash(pathway))
+        Graph.add_node(0, color="green")
+        Graph.add_node(1, color="red")
+        # Parsing
+        try:
+            tree = parse_definition(pathway)
+        except ValueError as e:
+            logging.debug(f"{e}, using recursive parsing")
+            Graph, dict_edges, unnecessary_nodes = self.recursive_parsing(
+                G=Graph,
+                dict_edges={},
+                unnecessary_nodes=[],
+                expression=pathway,
+                start_node=0,
+                end_node=1,
+                weight=1,
+            )
+        else:
+            Graph, dict_edges, unnecessary_nodes = self.build_graph(
+                G=Graph,
+                dict_edges={},
+                unnecessary_nodes=[],
+                pathway=pathway,
+                tree=tree,
+                start_node=0,
+                end_node=1,
+                weight=1,
+            )
+        return tuple([Graph, dict_edges, unnecessary_nodes])
+
+    def make_graphs(self, modules):
+        """
+        Function creates graphs of modules, in worker processes if threads > 1.
+        :param modules: list of (module, definition)
+        :return: list of graphs in order of modules
+        """
+        pathways = [pathway for _, pathway in modules]
+        if self.threads > 1 and len(modules) > 1:
+            with ProcessPoolExecutor(
+                max_workers=self.threads,
+                initializer=init_worker,
+                initargs=(self,),
+            ) as executor:
+                # map keeps order of modules
+                return list(
+                    executor.map(make_graph, pathways, chunksize=MODULES_PER_TASK)
+                )
+        return [self.make_graph(pathway) for pathway in pathways]
+
     def _is_tsv_format(self):
         """Detect if input file is in TSV format (new) or old format"""
         with open(self.input_file, "r") as f:
@@ -424,9 +621,15 @@ class GraphsGenerator:
         logger.info("Start graphs generation")
 
         # Detect file format and read modules
+        modules_info = None
         if self._is_tsv_format():
             logger.info("Detected TSV format input file")
             modules = self._read_modules_from_tsv()
+            try:
+                # names and classes are saved into compiled graphs
+                modules_info = parse_modules_table_tsv(self.input_file)
+            except ValueError:
+                logger.info("No names and classes of modules in input file")
         else:
             logger.info("Detected old format input file (module:definition)")
             modules = self._read_modules_from_old_format()
@@ -452,48 +655,60 @@ class GraphsGenerator:
             logger.info(f"  - Modules to reuse from existing: {len(modules_to_reuse)}")
 
             # Start with existing graphs for modules that haven't changed
-            graphs = {}
+            new_graphs = {}
             reused_count = 0
-            for module in modules_to_reuse:
-                if module in existing_graphs:
-                    graphs[module] = existing_graphs[module]
+            for module in modules_dict:
+                if module in modules_to_reuse and module in existing_graphs:
+                    new_graphs[module] = existing_graphs[module]
                     reused_count += 1
                     logger.debug(f"Reusing graph for {module}")
 
             logger.info(f"Reused {reused_count} existing graphs")
 
-            # Generate graphs only for changed modules
+            # Generate graphs only for changed modules (in order of input)
             modules_to_process = [
-                (name, modules_dict[name]) for name in modules_to_generate
+                (name, modules_dict[name])
+                for name in modules_dict
+                if name in modules_to_generate
             ]
+        elif existing_graphs:
+            # Incremental mode: regenerate modules with changed definition hash
+            logger.info("Incremental update mode by definition hashes")
+            new_graphs = {}
+            modules_to_process = []
+            for name, pathway in modules_dict.items():
+                existing = existing_graphs.get(name)
+                if existing is not None and existing[0].graph.get(
+                    "definition_hash"
+                ) == get_definition_hash(pathway):
+                    new_graphs[name] = existing
+                    logger.debug(f"Reusing graph for {name}")
+                else:
+                    modules_to_process.append((name, pathway))
+            logger.info(f"Reused {len(new_graphs)} existing graphs")
         else:
             # Full regeneration mode
             logger.info("Full regeneration mode (no incremental update)")
-            graphs = {}
-            modules_to_process = modules
+            new_graphs = {}
+            modules_to_process = list(modules_dict.items())
 
         # Process modules (either all or just changed ones)
         if modules_to_process:
-            logger.info(f"Generating {len(modules_to_process)} graphs...")
-            for name, pathway in modules_to_process:
-                logger.debug(f"Processing {name}")
-                # Graph creation:
-                Graph = nx.MultiDiGraph()
-                Graph.add_node(0, color="green")
-                Graph.add_node(1, color="red")
-                # Parsing
-                Graph, dict_edges, unnecessary_nodes = self.recursive_parsing(
-                    G=Graph,
-                    dict_edges={},
-                    unnecessary_nodes=[],
-                    expression=pathway,
-                    start_node=0,
-                    end_node=1,
-                    weight=1,
-                )
-                # Saving
-                graphs[name] = tuple([Graph, dict_edges, unnecessary_nodes])
-                time.sleep(1)
+            logger.info(
+                f"Generating {len(modules_to_process)} graphs in {self.threads} process(es)..."
+            )
+            for (name, _), graph in zip(
+                modules_to_process, self.make_graphs(modules_to_process)
+            ):
+                new_graphs[name] = graph
+
+        # graphs are saved in order of input file and each graph is copied through its own pickle,
+        # so graphs.pkl does not depend on objects shared between graphs made in different processes
+        graphs = {
+            name: pickle.loads(pickle.dumps(new_graphs[name]))
+            for name in modules_dict
+            if name in new_graphs
+        }
 
         # Final summary
         logger.info(f"Total graphs in output: {len(graphs)}")
@@ -510,6 +725,27 @@ class GraphsGenerator:
         with open(path_output, "wb") as f:
             pickle.dump(graphs, f)
         logger.info(f"Graphs saved to {path_output}")
+        path_compiled = os.path.join(self.output_dir, "graphs.kgc")
+        compile_graphs(graphs, modules_info).save(path_compiled)
+        logger.info(f"Compiled graphs saved to {path_compiled}")
+
+
+def init_worker(generator):
+    """
+    Function sets generator of worker process.
+    :param generator: GraphsGenerator
+    """
+    global _worker_generator
+    _worker_generator = generator
+
+
+def make_graph(pathway):
+    """
+    Function creates graph of module in worker process.
+    :param pathway: definition of module
+    :return: graph, dict of edges, unnecessary nodes
+    """
+    return _worker_generator.make_graph(pathway)
 
 
 @click.command()
@@ -525,14 +761,14 @@ class GraphsGenerator:
     "-o",
     "--outdir",
     default="outdir",
-    help="Output directory where graphs.pkl will be stored",
+    help="Output directory where graphs.pkl and graphs.kgc will be stored",
     show_default=True,
 )
 @click.option(
     "-e",
     "--existing-graphs",
     type=click.Path(exists=True),
-    help="Existing graphs.pkl file to reuse unchanged graphs (for incremental updates)",
+    help="Existing graphs.pkl file to reuse graphs of unchanged modules (for incremental updates)",
 )
 @click.option(
     "-c",
@@ -540,6 +776,14 @@ class GraphsGenerator:
     type=click.Path(exists=True),
     help="Changed modules file (changed.tsv) - only regenerate graphs for these modules",
 )
+@click.option(
+    "-j",
+    "--threads",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Number of worker processes for graphs generation",
+    show_default=True,
+)
 @click.option(
     "-v",
     "--verbose",
@@ -547,9 +791,10 @@ class GraphsGenerator:
     help="Enable verbose logging",
 )
 @click.version_option(version=get_version(), prog_name="make_graphs")
-def main(input_file, outdir, existing_graphs, changed, verbose):
+def main(input_file, outdir, existing_graphs, changed, threads, verbose):
     """
-    Generates graph structures for KEGG modules and saves them to graphs.pkl.
+    Generates graph structures for KEGG modules and saves them to graphs.pkl
+    and to compiled graphs.kgc used by give_completeness.
 
     Supports both formats:
     - New TSV format: modules_table.tsv with columns (module, definition, name, class)
@@ -559,10 +804,10 @@ def main(input_file, outdir, existing_graphs, changed, verbose):
 
     Incremental Updates:
     \b
-    Use --existing-graphs and --changed together for incremental updates:
+    Use --existing-graphs for incremental updates:
     - Loads existing graphs from --existing-graphs
-    - Only regenerates graphs for modules in --changed file
-    - Reuses graphs for unchanged modules
+    - Reuses graphs of modules with unchanged definition (graphs keep hash of definition)
+    - With --changed, only regenerates graphs for modules in --changed file instead
     - Removes graphs for modules not in --input (deleted from KEGG)
 
     Examples:
@@ -571,17 +816,17 @@ def main(input_file, outdir, existing_graphs, changed, verbose):
     make_graphs -i modules_table.tsv -o graphs_output
 
     \b
-    # Incremental update (only changed modules)
+    # Incremental update (only modules with changed definitions)
+    make_graphs -i modules_table.tsv -o graphs_output -e old_graphs.pkl
+
+    \b
+    # Incremental update (only modules in changed.tsv)
     make_graphs -i modules_table.tsv -o graphs_output \\
                 -e old_graphs.pkl -c changed.tsv
     """
     setup_logging(verbose)
 
     # Validate incremental update options
-    if existing_graphs and not changed:
-        logging.warning(
-            "--existing-graphs provided without --changed. Will perform full regeneration."
-        )
     if changed and not existing_graphs:
         logging.warning(
             "--changed provided without --existing-graphs. Will regenerate all modules in changed file."
@@ -592,6 +837,7 @@ def main(input_file, outdir, existing_graphs, changed, verbose):
         output_dir=outdir,
         existing_graphs_file=existing_graphs,
         changed_file=changed,
+        threads=threads,
     )
     graphs_generator.pathways_processing()
 
@@ -15,13 +15,75 @@
 # limitations under the License.
 
 
+import collections
+import functools
+import mmap
 import os
-import tempfile
+from concurrent.futures import ProcessPoolExecutor
 
 import click
-from Bio import SeqIO
 
-from .utils import get_version
+from .utils import COMPRESSED_SUFFIXES, get_version, open_file
+
+# bytes of HMMER table in one task of worker process with --threads
+CHUNK_SIZE = 64 * 1024 * 1024
+# number of tasks submitted ahead per worker, results are added in order of file
+PENDING_TASKS_PER_THREAD = 4
+
+# number of hit names found by substring search remembered by ContigResolver
+RESOLVED_CACHE_SIZE = 65536
+
+# (converter, parser, keep converted lines) of worker process, created by init_worker
+_worker_state = None
+
+# columns of tab-separated domtblout (the same for hmmscan and hmmsearch)
+COLUMN_EVALUE = 6
+COLUMN_SCORE = 7
+COLUMN_DOMAIN_SCORE = 13
+# KOs per contig: all hits, unique KOs or KO of the hit with the best score
+DEDUP_MODES = ["none", "unique", "best"]
+
+
+def _header_name(header):
+    """Name of FASTA record is the first word of header (as record.name in Bio.SeqIO)"""
+    words = header.split(None, 1)
+    return words[0].decode("utf-8") if words else ""
+
+
+def read_fasta_names(fasta, use_mmap=False):
+    """
+    Function yields names of FASTA records in the order of file, reading only header lines.
+    If samtools index (<fasta>.fai) exists and is not older than FASTA, names are taken from it.
+    :param fasta: FASTA file
+    :param use_mmap: scan memory-mapped file for headers instead of reading it line by line
+                     (compressed files are always read line by line)
+    """
+    index = fasta + ".fai"
+    if os.path.exists(index) and os.path.getmtime(index) >= os.path.getmtime(fasta):
+        with open(index, "r") as file_in:
+            for line in file_in:
+                yield line.split("\t", 1)[0]
+        return
+    with open_file(fasta, "rb") as file_in:
+        if not use_mmap or fasta.endswith(COMPRESSED_SUFFIXES):
+            for line in file_in:
+                if line.startswith(b">"):
+                    yield _header_name(line[1:])
+            return
+        if os.path.getsize(fasta) == 0:
+            return
+        with mmap.mmap(file_in.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            # position of new line before header, -1 for header at the start of file
+            newline = -1 if data[:1] == b">" else data.find(b"\n>")
+            while newline != -1 or data[:1] == b">":
+                start = newline + 2
+                end = data.find(b"\n", start)
+                yield _header_name(data[start: end if end != -1 else len(data)])
+                if end == -1:
+                    break
+                newline = data.find(b"\n>", end)
+                if newline == -1:
+                    break
 
 
 class HmmerTableConverter:
@@ -38,17 +100,120 @@ class HmmerTableConverter:
         self.input_file = input_file
         self.output_file = output_file
 
+    def convert_line(self, line):
+        """
+        Converts line of hmm-table to tab-separated line (None for comments).
+        The last column (description of target) can contain spaces, so it is kept as one field.
+        """
+        if line.startswith("#"):
+            return None
+        line = list(filter(None, line.strip().split(" ")))
+        return "\t".join(line[:22] + [" ".join(line[22:])])
+
+    def iterate(self):
+        """
+        Yields tab-separated lines of hmm-table one by one.
+        If output_file is set, lines are also written into it on the way.
+        """
+        file_out = open_file(self.output_file, "w") if self.output_file else None
+        try:
+            with open_file(self.input_file, "r") as file_in:
+                for line in file_in:
+                    modified_line = self.convert_line(line)
+                    if modified_line is None:
+                        continue
+                    if file_out:
+                        file_out.write(modified_line + "\n")
+                    yield modified_line
+        finally:
+            if file_out:
+                file_out.close()
+
     def convert(self):
         """Convert space-separated HMMER table to tab-separated format."""
-        with open(self.input_file, "r") as file_in, open(
-            self.output_file, "w"
-        ) as file_out:
-            for line in file_in:
-                if line.startswith("#"):
-                    continue
-                line = list(filter(None, line.strip().split(" ")))
-                modified_line = "\t".join(line[:22] + [" ".join(line[22:])])
-                file_out.write(modified_line + "\n")
+        for _ in self.iterate():
+            pass
+
+
+class ContigResolver:
+    """Finds FASTA record names that are substrings of contig names from HMMER table."""
+
+    def __init__(self, names, cache_size: int = RESOLVED_CACHE_SIZE):
+        """
+        Names of hits in HMMER table can differ from FASTA names (ex. have extra suffix),
+        so every FASTA name that is a substring of hit name is a match.
+        Names are kept in a set together with their prefixes of the shortest name length.
+        Substrings of hit are looked up in the set only at positions where such prefix starts.
+        Hit equal to the shortest FASTA names can not contain other names and is returned directly,
+        other hits are searched lazily and remembered in LRU cache, as hits of the same contig repeat.
+
+        :param names: FASTA record names in the order of FASTA file
+        :param cache_size: maximum number of hit names remembered after substring search
+        """
+        self.order = {name: num for num, name in enumerate(names)}
+        self.lengths = sorted({len(name) for name in self.order})
+        min_length = self.lengths[0] if self.lengths else 0
+        self.min_length = min_length
+        self.prefixes = {name[:min_length] for name in self.order}
+        self.resolve_substrings = functools.lru_cache(maxsize=cache_size)(
+            self.find_substrings
+        )
+
+    def __len__(self):
+        return len(self.order)
+
+    def find_substrings(self, contig):
+        """Returns FASTA names that are substrings of contig in the order of FASTA file."""
+        found = set()
+        for start in range(len(contig) - self.min_length + 1):
+            if contig[start: start + self.min_length] not in self.prefixes:
+                continue
+            for length in self.lengths:
+                if start + length > len(contig):
+                    break
+                if contig[start: start + length] in self.order:
+                    found.add(contig[start: start + length])
+        return sorted(found, key=self.order.__getitem__)
+
+    def resolve(self, contig):
+        """
+        Returns FASTA names that are substrings of contig in the order of FASTA file
+        (one name - match, no names - contig not found, several names - ambiguous match).
+        """
+        if len(contig) == self.min_length and contig in self.order:
+            return [contig]
+        return self.resolve_substrings(contig)
+
+
+def parse_ko_thresholds(filename):
+    """
+    Function reads thresholds of KOs from KOfam ko_list file
+    (tab-separated with columns knum, threshold and score_type, "-" for KOs without threshold).
+    :param filename: ko_list file
+    :return: {KO: (threshold, column with score)}
+    """
+    thresholds = {}
+    with open_file(filename, "r") as file_in:
+        header = file_in.readline().rstrip("\n").split("\t")
+        for col in ["knum", "threshold", "score_type"]:
+            if col not in header:
+                raise ValueError(f"KO thresholds file must have '{col}' column")
+        knum_idx = header.index("knum")
+        threshold_idx = header.index("threshold")
+        score_type_idx = header.index("score_type")
+        for line in file_in:
+            fields = line.rstrip("\n").split("\t")
+            if len(fields) <= max(knum_idx, threshold_idx, score_type_idx):
+                continue
+            if fields[threshold_idx] == "-":
+                continue
+            column = (
+                COLUMN_DOMAIN_SCORE
+                if fields[score_type_idx] == "domain"
+                else COLUMN_SCORE
+            )
+            thresholds[fields[knum_idx]] = (float(fields[threshold_idx]), column)
+    return thresholds
 
 
 class HmmerTableParser:
@@ -61,6 +226,11 @@ class HmmerTableParser:
         output_dir: str,
         hmmtool: str,
         output_basename: str = None,
+        use_mmap: bool = False,
+        max_evalue: float = None,
+        min_score: float = None,
+        ko_thresholds: dict = None,
+        dedup: str = "none",
     ):
         """
         Script parses hmmer tab-separated file. It generates a list of KOs per each contig.
@@ -72,6 +242,11 @@ class HmmerTableParser:
         :param output_dir: name of output directory
         :param hmmtool: hmmscan / hmmsearch
         :param output_basename: optional custom basename for output file (if not provided, uses input_table basename)
+        :param use_mmap: read FASTA headers through mmap
+        :param max_evalue: hits with larger full sequence E-value are skipped
+        :param min_score: hits with smaller full sequence score are skipped
+        :param ko_thresholds: {KO: (threshold, column with score)}, see parse_ko_thresholds
+        :param dedup: KOs per contig: none (all hits), unique or best (KO of hit with the best score)
         """
         self.input_table = input_table
         self.input_fasta = input_fasta
@@ -80,14 +255,20 @@ class HmmerTableParser:
             os.makedirs(self.output_dir)
         self.hmmtool = hmmtool
         self.output_basename = output_basename
+        self.use_mmap = use_mmap
+        # filtering and deduplication of hits
+        self.max_evalue = max_evalue
+        self.min_score = min_score
+        self.ko_thresholds = ko_thresholds or {}
+        self.dedup = dedup
+        self.best_scores = {}
 
     def get_dir_contigs(self):
         """Extract contig names from FASTA file."""
         dict_contigs = {}
-        seq_records = SeqIO.parse(self.input_fasta, "fasta")
-        for line in seq_records:
-            if line.name not in dict_contigs:
-                dict_contigs[line.name] = []
+        for name in read_fasta_names(self.input_fasta, use_mmap=self.use_mmap):
+            if name not in dict_contigs:
+                dict_contigs[name] = []
         click.echo(f"Found {len(dict_contigs)} contigs in FASTA file")
         return dict_contigs
 
@@ -101,21 +282,159 @@ class HmmerTableParser:
         else:
             raise ValueError(f"Incorrect HMM tool specified: {self.hmmtool}")
 
+    def is_passed(self, line, kegg_annotation):
+        """Check hit against E-value, score and threshold of KO."""
+        if self.max_evalue is not None:
+            if float(line[COLUMN_EVALUE]) > self.max_evalue:
+                return False
+        if self.min_score is not None:
+            if float(line[COLUMN_SCORE]) < self.min_score:
+                return False
+        if kegg_annotation in self.ko_thresholds:
+            threshold, column = self.ko_thresholds[kegg_annotation]
+            if float(line[column]) < threshold:
+                return False
+        return True
+
+    def parse_line(self, line):
+        """
+        Parses tab-separated line of HMMER table without looking up FASTA names.
+        :param line: tab-separated line
+        :return: (contig name of hit, KO, score of hit) or None if hit is filtered out
+        """
+        line = line.strip().split("\t")
+        contig, kegg_annotation = self.choose_columns(line)
+        if not self.is_passed(line, kegg_annotation):
+            return None
+        score = float(line[COLUMN_SCORE]) if self.dedup == "best" else None
+        return contig, kegg_annotation, score
+
+    def annotate_line(self, resolver, line):
+        """
+        Finds FASTA name for tab-separated line of HMMER table.
+        :param resolver: ContigResolver with FASTA names
+        :param line: tab-separated line
+        :return: (FASTA name, KO, score of hit) or (None, warning, None) if contig is not found or ambiguous
+                 or (None, None, None) if hit is filtered out
+        """
+        hit = self.parse_line(line)
+        if hit is None:
+            return None, None, None
+        return self.resolve_hit(resolver, *hit)
+
+    def resolve_hit(self, resolver, contig, kegg_annotation, score):
+        """
+        Finds FASTA name for contig of parsed hit.
+        :return: (FASTA name, KO, score of hit) or (None, warning, None) if contig is not found or ambiguous
+        """
+        contig_in_fasta = resolver.resolve(contig)
+        if len(contig_in_fasta) == 0:
+            return None, f"Warning: Contig {contig} not found in FASTA file", None
+        elif len(contig_in_fasta) == 1:
+            return contig_in_fasta[0], kegg_annotation, score
+        else:
+            return None, f"Warning: Ambiguous contig match for {contig}", None
+
+    def add_hit(self, dict_contigs, name, kegg_annotation, score):
+        """Add KO of hit to contig according to deduplication mode, or print warning for hit without contig."""
+        if name is None:
+            if kegg_annotation:
+                click.echo(kegg_annotation)
+        elif self.dedup == "unique":
+            if kegg_annotation not in dict_contigs[name]:
+                dict_contigs[name].append(kegg_annotation)
+        elif self.dedup == "best":
+            # the first of hits with the same score is kept
+            if name not in self.best_scores or score > self.best_scores[name]:
+                self.best_scores[name] = score
+                dict_contigs[name] = [kegg_annotation]
+        else:
+            dict_contigs[name].append(kegg_annotation)
+
+    def add_annotations(self, dict_contigs, lines):
+        """
+        Assign KOs from tab-separated lines of HMMER table to contigs.
+        :param dict_contigs: dict of lists of KOs by FASTA names, updated in place
+        :param lines: iterable of tab-separated lines (file or HmmerTableConverter.iterate())
+        """
+        resolver = ContigResolver(dict_contigs)
+        for line in lines:
+            self.add_hit(dict_contigs, *self.annotate_line(resolver, line))
+
+    def add_annotations_parallel(
+        self,
+        dict_contigs,
+        input_file,
+        threads,
+        intermediate_file=None,
+        chunk_size=CHUNK_SIZE,
+    ):
+        """
+        Assign KOs from HMMER table to contigs in worker processes.
+        File is split into chunks of lines, every chunk is converted and parsed by worker.
+        Contigs of hits are resolved to FASTA names in the main process with one ContigResolver,
+        so FASTA names are not copied to workers. Results are added in order of chunks,
+        so output is the same as with add_annotations.
+        :param dict_contigs: dict of lists of KOs by FASTA names, updated in place
+        :param input_file: HMMER table (not compressed)
+        :param threads: number of worker processes
+        :param intermediate_file: optional file for tab-separated table
+        :param chunk_size: approximate size of chunk in bytes
+        """
+        resolver = ContigResolver(dict_contigs)
+        file_out = open_file(intermediate_file, "w") if intermediate_file else None
+        try:
+            with ProcessPoolExecutor(
+                max_workers=threads,
+                initializer=init_worker,
+                initargs=(
+                    self.hmmtool,
+                    self.output_dir,
+                    input_file,
+                    bool(intermediate_file),
+                    {
+                        "max_evalue": self.max_evalue,
+                        "min_score": self.min_score,
+                        "ko_thresholds": self.ko_thresholds,
+                        "dedup": self.dedup,
+                    },
+                ),
+            ) as executor:
+                pending = collections.deque()
+                for start, end in get_line_chunks(input_file, chunk_size):
+                    pending.append(executor.submit(parse_chunk, start, end))
+                    if len(pending) >= threads * PENDING_TASKS_PER_THREAD:
+                        self.add_parsed_chunk(
+                            dict_contigs, resolver, pending.popleft(), file_out
+                        )
+                while pending:
+                    self.add_parsed_chunk(
+                        dict_contigs, resolver, pending.popleft(), file_out
+                    )
+        finally:
+            if file_out:
+                file_out.close()
+
+    def add_parsed_chunk(self, dict_contigs, resolver, future, file_out):
+        """Add hits parsed by worker to contigs, their FASTA names are resolved here."""
+        hits, converted_lines = future.result()
+        if file_out:
+            file_out.write(converted_lines)
+        for hit in hits:
+            self.add_hit(dict_contigs, *self.resolve_hit(resolver, *hit))
+
+    def save(self, dict_contigs, path_output):
+        """Save contigs with KOs in the order of FASTA file."""
+        with open_file(path_output, "w") as file_out:
+            for key in dict_contigs:
+                if len(dict_contigs[key]) != 0:
+                    file_out.write("\t".join([key] + list(dict_contigs[key])) + "\n")
+
     def parse(self, dict_contigs):
         """Parse the tab-separated HMMER table and assign KOs to contigs."""
         # reading all annotations
-        with open(self.input_table, "r") as file_in:
-            for line in file_in:
-                line = line.strip().split("\t")
-                contig, kegg_annotation = self.choose_columns(line)
-                contig_in_fasta = [name for name in dict_contigs if name in contig]
-                if len(contig_in_fasta) == 0:
-                    click.echo(f"Warning: Contig {contig} not found in FASTA file")
-                    continue
-                elif len(contig_in_fasta) == 1:
-                    dict_contigs[contig_in_fasta[0]].append(kegg_annotation)
-                else:
-                    click.echo(f"Warning: Ambiguous contig match for {contig}")
+        with open_file(self.input_table, "r") as file_in:
+            self.add_annotations(dict_contigs, file_in)
 
         # leave unique records and save
         if self.output_basename:
@@ -123,14 +442,66 @@ class HmmerTableParser:
         else:
             basename = os.path.basename(self.input_table)
         path_output = os.path.join(self.output_dir, basename + "_parsed")
-        with open(path_output, "w+") as file_out:
-            for key in dict_contigs:
-                if len(dict_contigs[key]) != 0:
-                    file_out.write("\t".join([key] + list(dict_contigs[key])) + "\n")
+        self.save(dict_contigs, path_output)
         click.echo(f"Output saved to: {path_output}")
         return path_output
 
 
+def get_line_chunks(filename, chunk_size=CHUNK_SIZE):
+    """
+    Function splits file into byte ranges of about chunk_size, every range ends at the end of line.
+    :return: list of (start, end)
+    """
+    size = os.path.getsize(filename)
+    boundaries = [0]
+    with open(filename, "rb") as file_in:
+        while boundaries[-1] < size:
+            file_in.seek(boundaries[-1] + chunk_size)
+            file_in.readline()
+            boundaries.append(min(file_in.tell(), size))
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def init_worker(hmmtool, output_dir, input_file, keep_converted, filters):
+    """Initializer of worker process: converter and parser are created once per process."""
+    global _worker_state
+    _worker_state = (
+        HmmerTableConverter(input_file=input_file, output_file=None),
+        HmmerTableParser(
+            input_table=input_file,
+            input_fasta=None,
+            output_dir=output_dir,
+            hmmtool=hmmtool,
+            **filters,
+        ),
+        keep_converted,
+    )
+
+
+def parse_chunk(start, end):
+    """
+    Function converts and parses lines of HMMER table between start and end in worker process.
+    :return: list of hits passed filters (see HmmerTableParser.parse_line), converted lines if they are kept
+    """
+    converter, parser, keep_converted = _worker_state
+    hits, converted_lines = [], []
+    with open(converter.input_file, "rb") as file_in:
+        file_in.seek(start)
+        position = start
+        while position < end:
+            line = file_in.readline()
+            position += len(line)
+            modified_line = converter.convert_line(line.decode("utf-8"))
+            if modified_line is None:
+                continue
+            if keep_converted:
+                converted_lines.append(modified_line + "\n")
+            hit = parser.parse_line(modified_line)
+            if hit is not None:
+                hits.append(hit)
+    return hits, "".join(converted_lines)
+
+
 @click.command()
 @click.option(
     "-i",
@@ -170,14 +541,65 @@ class HmmerTableParser:
     type=click.Path(),
     help="Save intermediate tab-separated table to this file (optional)",
 )
+@click.option(
+    "--mmap",
+    "use_mmap",
+    is_flag=True,
+    help="Scan FASTA headers through mmap (<fasta>.fai is used instead of FASTA if present)",
+)
+@click.option(
+    "-j",
+    "--threads",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Number of worker processes for parsing of HMMER table (not compressed)",
+    show_default=True,
+)
+@click.option(
+    "-e",
+    "--evalue",
+    "max_evalue",
+    type=float,
+    help="Skip hits with full sequence E-value above this value",
+)
+@click.option(
+    "--min-score",
+    type=float,
+    help="Skip hits with full sequence score below this value",
+)
+@click.option(
+    "--ko-thresholds",
+    type=click.Path(exists=True),
+    help="KOfam ko_list file: hits below threshold of their KO (full or domain score) are skipped",
+)
+@click.option(
+    "--dedup",
+    type=click.Choice(DEDUP_MODES),
+    default="none",
+    help="KOs per contig: all hits, unique KOs or only KO of the hit with the best full sequence score",
+    show_default=True,
+)
 @click.version_option(version=get_version(), prog_name="parse_hmmer_table")
-def main(input_file, fasta_file, hmm_tool, output_file, intermediate_file):
+def main(
+    input_file,
+    fasta_file,
+    hmm_tool,
+    output_file,
+    intermediate_file,
+    use_mmap,
+    threads,
+    max_evalue,
+    min_score,
+    ko_thresholds,
+    dedup,
+):
     """
     Process HMMER domtblout output to extract KO annotations per contig.
 
-    This tool converts HMMER's domain table output format to a tab-separated
-    format and then parses it to generate a file with KO annotations for each
-    contig. The output format is: contig_name<TAB>KO1<TAB>KO2<TAB>...
+    This tool reads HMMER's domain table output once, converting every line to
+    a tab-separated format and assigning its KO to the contig, to generate a file
+    with KO annotations for each contig. The output format is: contig_name<TAB>KO1<TAB>KO2<TAB>...
+    The tab-separated table is written only with --save-intermediate.
 
     \b
     Example:
@@ -193,71 +615,42 @@ def main(input_file, fasta_file, hmm_tool, output_file, intermediate_file):
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
 
-    # Step 1: Convert to tab-separated format
-    click.echo("Step 1: Converting HMMER table to tab-separated format...")
-
-    if intermediate_file:
-        # User wants to save the intermediate file
-        temp_tsv = intermediate_file
-        keep_temp = True
+    parser = HmmerTableParser(
+        input_table=input_file,
+        input_fasta=fasta_file,
+        output_dir=output_dir,
+        hmmtool=hmm_tool,
+        use_mmap=use_mmap,
+        max_evalue=max_evalue,
+        min_score=min_score,
+        ko_thresholds=parse_ko_thresholds(ko_thresholds) if ko_thresholds else None,
+        dedup=dedup,
+    )
+    contigs = parser.get_dir_contigs()
+
+    # Lines are converted to tab-separated format and parsed in one pass,
+    # tab-separated table is written only if it was asked for
+    click.echo("Converting and parsing HMMER table to extract KOs per contig...")
+    if threads > 1 and input_file.endswith(COMPRESSED_SUFFIXES):
+        click.echo("Compressed HMMER table is parsed in one process")
+        threads = 1
+    if threads > 1:
+        parser.add_annotations_parallel(
+            contigs, input_file, threads, intermediate_file=intermediate_file
+        )
     else:
-        # Create temporary file in same directory as output
-        with tempfile.NamedTemporaryFile(
-            mode="w", suffix=".tsv", delete=False, dir=output_dir
-        ) as tmp_file:
-            temp_tsv = tmp_file.name
-        keep_temp = False
-
-    try:
-        converter = HmmerTableConverter(input_file=input_file, output_file=temp_tsv)
-        converter.convert()
-        if intermediate_file:
-            click.echo(f"Tab-separated table saved to: {temp_tsv}")
-        else:
-            click.echo("Tab-separated table created (temporary)")
-
-        # Step 2: Parse the tab-separated table
-        click.echo("\nStep 2: Parsing tab-separated table to extract KOs per contig...")
-        contigs = {}
-        seq_records = SeqIO.parse(fasta_file, "fasta")
-        for line in seq_records:
-            if line.name not in contigs:
-                contigs[line.name] = []
-        click.echo(f"Found {len(contigs)} contigs in FASTA file")
-
-        # Reading all annotations
-        with open(temp_tsv, "r") as file_in:
-            for line in file_in:
-                line = line.strip().split("\t")
-                # Choose columns based on tool
-                if hmm_tool == "hmmsearch":
-                    contig, kegg_annotation = line[0], line[3]
-                elif hmm_tool == "hmmscan":
-                    contig, kegg_annotation = line[3], line[0]
-                else:
-                    raise ValueError(f"Incorrect HMM tool specified: {hmm_tool}")
-
-                contig_in_fasta = [name for name in contigs if name in contig]
-                if len(contig_in_fasta) == 0:
-                    click.echo(f"Warning: Contig {contig} not found in FASTA file")
-                    continue
-                elif len(contig_in_fasta) == 1:
-                    contigs[contig_in_fasta[0]].append(kegg_annotation)
-                else:
-                    click.echo(f"Warning: Ambiguous contig match for {contig}")
-
-        # Save output
-        with open(output_file, "w+") as file_out:
-            for key in contigs:
-                if len(contigs[key]) != 0:
-                    file_out.write("\t".join([key] + list(contigs[key])) + "\n")
-
-        click.echo("\nProcessing complete!")
-        click.echo(f"Final output: {output_file}")
-    finally:
-        # Clean up temporary file only if user didn't request to save it
-        if not keep_temp and os.path.exists(temp_tsv):
-            os.remove(temp_tsv)
+        converter = HmmerTableConverter(
+            input_file=input_file, output_file=intermediate_file
+        )
+        parser.add_annotations(contigs, converter.iterate())
+    if intermediate_file:
+        click.echo(f"Tab-separated table saved to: {intermediate_file}")
+
+    # Save output
+    parser.save(contigs, output_file)
+
+    click.echo("\nProcessing complete!")
+    click.echo(f"Final output: {output_file}")
 
 
 if __name__ == "__main__":
@@ -19,22 +19,22 @@ import csv
 import logging
 import os
 from importlib.resources import files
+from typing import TYPE_CHECKING
 
 import click
-import graphviz
-import networkx as nx
-import pydot
 
-from .utils import get_version, parse_graphs_input
+from .utils import get_version, open_file, parse_graphs_input
 
-logging.basicConfig(encoding="utf-8", level=logging.DEBUG)
+# graphviz and pydot are imported by backend that is used, networkx only for annotations
+if TYPE_CHECKING:
+    import networkx as nx
 
 
 class PlotModuleCompletenessGraph:
     def __init__(
         self,
         modules_completeness: dict,
-        graphs: nx.MultiDiGraph,
+        graphs: "nx.MultiDiGraph",
         modules_definitions: dict,
         outdir: str,
         modules_list: list = [],
@@ -72,6 +72,8 @@ class PlotModuleCompletenessGraph:
         return f"1/{int(1 / weight)}"
 
     def create_graph_dot(self, name, presented, graph, pathways_schema):
+        import pydot
+
         # Create a pydot graph
         dot = pydot.Dot(name=name, graph_type="digraph", comment=pathways_schema)
         edges = graph[0].edges
@@ -100,6 +102,8 @@ class PlotModuleCompletenessGraph:
         return dot
 
     def create_graph(self, name, presented, graph, pathways_schema):
+        import graphviz
+
         dot = graphviz.Digraph(name, comment=pathways_schema)
         edges = graph[0].edges
         for edge, count in zip(edges, range(len(edges))):
@@ -208,7 +212,7 @@ def parse_completeness_input(filepath):
     """
     pathways = {}
     if filepath:
-        with open(filepath, "r") as file_in:
+        with open_file(filepath, "r") as file_in:
             for line in file_in:
                 line = line.strip().split("\t")
                 if line[0] == "contig":
@@ -231,7 +235,7 @@ def parse_input_modules(
     elif input_modules_file:
         logging.info(f"Using modules from {input_modules_file}")
         modules_list = []
-        with open(input_modules_file, "r") as f:
+        with open_file(input_modules_file, "r") as f:
             reader = csv.reader(f, delimiter=list_separator)
             for row in reader:
                 modules_list.extend(row)
@@ -315,6 +319,7 @@ def main(
     # Plot modules from file
     plot_modules_graphs -l modules.txt -g graphs.pkl
     """
+    logging.basicConfig(encoding="utf-8", level=logging.DEBUG)
     if not input_completeness and not input_modules_list and not modules_file:
         raise click.UsageError(
             "Must provide at least one of: --input-completeness, --modules, or --modules-file"
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright 2026 EMBL - European Bioinformatics Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import logging
+import sys
+import tempfile
+import time
+from collections import Counter
+from importlib.resources import files
+
+import click
+
+from .compiled_graphs import load_graphs
+from .give_completeness import CompletenessCalculator
+from .utils import get_version, open_file, setup_logging
+
+COLUMNS = [
+    "module",
+    "nodes",
+    "edges",
+    "kos",
+    "paths",
+    "max_branching",
+    "time_ms",
+]
+
+
+def profile_module(calculator, graph, repeat):
+    """
+    Function collects size and cost of module graph.
+    Number of paths is counted by one pass over edges in topological order,
+    time is the smallest time of calculate_percentage with all KOs of module presented.
+    :param calculator: CompletenessCalculator with graphs of module
+    :param graph: CompiledModule
+    :param repeat: number of measurements of time
+    :return: dict of values by COLUMNS
+    """
+    presented = frozenset(graph.labels)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        calculator.calculate_percentage(graph, presented)
+        times.append(time.perf_counter() - start)
+    return {
+        "module": graph.name,
+        "nodes": len(graph.node_ids),
+        "edges": len(graph.source),
+        "kos": len(graph.labels),
+        "paths": graph.count_paths(),
+        "max_branching": max(Counter(graph.source).values(), default=0),
+        "time_ms": min(times) * 1000,
+    }
+
+
+def profile_modules(graphs, repeat=3):
+    """
+    Function profiles all modules of graphs.
+    :param graphs: CompiledGraphs
+    :param repeat: number of measurements of time per module
+    :return: list of dicts sorted by time (the most expensive first), then by number of paths
+    """
+    with tempfile.TemporaryDirectory() as outdir:
+        calculator = CompletenessCalculator(
+            input_KOs={},
+            outdir=outdir,
+            outprefix="profile",
+            graphs=graphs,
+            include_weights=False,
+            plot_pathways=False,
+            per_contig=False,
+            cache_size=0,
+        )
+        profiles = [
+            profile_module(calculator, graphs.module(position), repeat)
+            for position in range(len(graphs))
+        ]
+    return sorted(
+        profiles, key=lambda profile: (-profile["time_ms"], -profile["paths"])
+    )
+
+
+def save_profiles(profiles, output_file):
+    """
+    Function writes profiles of modules into TSV.
+    :param profiles: list of dicts from profile_modules
+    :param output_file: output TSV
+    """
+    with open_file(output_file, "w") as file_out:
+        file_out.write("\t".join(COLUMNS) + "\n")
+        for profile in profiles:
+            values = [str(profile[column]) for column in COLUMNS[:-1]]
+            values.append(f"{profile['time_ms']:.3f}")
+            file_out.write("\t".join(values) + "\n")
+
+
+@click.command()
+@click.option(
+    "-g",
+    "--graphs",
+    type=click.Path(exists=True),
+    help="Graphs in compiled (.kgc) or pickle format (default: uses packaged graphs.kgc)",
+)
+@click.option(
+    "-o",
+    "--output",
+    default="modules_profile.tsv",
+    help="Output TSV with profile of every module",
+    show_default=True,
+)
+@click.option(
+    "-r",
+    "--repeat",
+    type=click.IntRange(min=1),
+    default=3,
+    help="Number of measurements of time per module (the smallest is reported)",
+    show_default=True,
+)
+@click.option(
+    "-v",
+    "--verbose",
+    is_flag=True,
+    help="Enable verbose logging",
+)
+@click.version_option(version=get_version(), prog_name="profile_modules")
+def main(graphs, output, repeat, verbose):
+    """
+    Report size and cost of every module graph, the most expensive modules first.
+
+    \b
+    Columns:
+    - nodes, edges, kos: size of graph and number of unique KOs
+    - paths: number of paths from start to end of pathway (counted, not enumerated)
+    - max_branching: the largest number of edges going out of one node
+    - time_ms: time of completeness calculation with all KOs of module presented
+    """
+    setup_logging(verbose)
+    logger = logging.getLogger(__name__)
+    graphs_filename = (
+        graphs
+        if graphs
+        else files("kegg_pathways_completeness.pathways_data").joinpath("graphs.kgc")
+    )
+    modules_graphs = load_graphs(graphs_filename)
+    if modules_graphs is None:
+        sys.exit(1)
+    logger.info(f"Profiling {len(modules_graphs)} modules")
+    profiles = profile_modules(modules_graphs, repeat)
+    save_profiles(profiles, output)
+    logger.info(f"Profile saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
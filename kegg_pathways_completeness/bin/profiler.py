@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright 2026 EMBL - European Bioinformatics Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import contextlib
+import json
+import sys
+import time
+
+from .utils import get_version
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+
+class Profiler:
+    def __init__(self):
+        """
+        Collects wall time and number of calls of stages and cumulative scoring time of modules.
+        Object is picklable, so worker processes get their own copy and send times of modules back.
+        """
+        self.start = time.perf_counter()
+        # name: [time in seconds, number of calls]
+        self.stages = {}
+        self.modules = {}
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._add(self.stages, name, time.perf_counter() - start)
+
+    def add_module_time(self, module, seconds):
+        self._add(self.modules, module, seconds)
+
+    def pop_modules(self):
+        """Returns times of modules collected since the previous call"""
+        modules, self.modules = self.modules, {}
+        return modules
+
+    def merge_modules(self, modules):
+        """Adds times of modules collected by worker process"""
+        for module, (seconds, calls) in modules.items():
+            self._add(self.modules, module, seconds, calls)
+
+    @staticmethod
+    def _add(records, name, seconds, calls=1):
+        record = records.setdefault(name, [0.0, 0])
+        record[0] += seconds
+        record[1] += calls
+
+    def report(self, **extra):
+        """
+        :param extra: additional values of report (ex. cache usage)
+        :return: dict with times of stages and modules (the most expensive modules first) and peak RSS
+        """
+        modules = sorted(self.modules.items(), key=lambda item: -item[1][0])
+        return {
+            "version": get_version(),
+            "command": sys.argv,
+            "total_s": time.perf_counter() - self.start,
+            "stages": {
+                name: {"time_s": seconds, "calls": calls}
+                for name, (seconds, calls) in self.stages.items()
+            },
+            "modules": {
+                name: {"time_s": seconds, "calls": calls}
+                for name, (seconds, calls) in modules
+            },
+            **get_peak_rss(),
+            **extra,
+        }
+
+    def save(self, filename, **extra):
+        with open(filename, "w") as file_out:
+            json.dump(self.report(**extra), file_out, indent=2)
+
+
+def stage(profiler, name):
+    """
+    :param profiler: Profiler or None if profiling is disabled
+    :param name: name of stage
+    :return: context manager that measures stage
+    """
+    return profiler.stage(name) if profiler is not None else contextlib.nullcontext()
+
+
+def get_peak_rss():
+    """
+    :return: peak resident set size in MiB of this process and of its finished child processes
+    """
+    if resource is None:
+        return {"peak_rss_mb": None, "peak_rss_children_mb": None}
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    unit = 1 if sys.platform == "darwin" else 1024
+    return {
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        * unit
+        / 2**20,
+        "peak_rss_children_mb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        * unit
+        / 2**20,
+    }
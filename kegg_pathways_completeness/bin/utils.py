@@ -15,6 +15,8 @@
 # limitations under the License.
 
 
+import gzip
+import io
 import logging
 import os
 import pickle
@@ -37,14 +39,78 @@ def setup_logging(verbose):
     )
 
 
-def intersection(lst1, lst2):
+# extensions of files that are opened with decompression
+COMPRESSED_SUFFIXES = (".gz", ".zst")
+
+
+def open_file(filename, mode="r"):
+    """
+    Function opens plain, gzip (.gz) or zstandard (.zst) file depending on extension.
+    Compressed files are decompressed while they are read, not in advance.
+    gzip files are written without timestamp, so the same content gives the same file.
+    :param filename: path to file
+    :param mode: r, w, a for text and rb, wb, ab for binary files
+    :return: file object
+    """
+    filename = str(filename)
+    binary = "b" in mode
+    mode = mode.replace("t", "").replace("b", "")
+    if filename.endswith(".gz"):
+        if mode == "r":
+            file_object = gzip.open(filename, "rb")
+        else:
+            file_object = gzip.GzipFile(filename, mode + "b", mtime=0)
+    elif filename.endswith(".zst"):
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError(
+                f"Package zstandard is required for {filename} (pip install zstandard)"
+            )
+        file_object = zstandard.open(filename, mode + "b")
+        if mode == "r":
+            # reader of zstandard does not support reading by lines
+            file_object = io.BufferedReader(file_object)
+    else:
+        return open(filename, mode + ("b" if binary else ""))
+    return file_object if binary else io.TextIOWrapper(file_object, encoding="utf-8")
+
+
+def parse_modules_table_tsv(tsv_file):
     """
-    Intersection of two sets
-    :param lst1: first input list
-    :param lst2: second input list
-    :return: intersection in list format
+    Parse new TSV format file (modules_table.tsv) into separate dictionaries.
+    Returns: (modules_definitions, modules_names, modules_classes)
     """
-    return list(set(lst1) & set(lst2))
+    modules_definitions = {}
+    modules_names = {}
+    modules_classes = {}
+
+    with open_file(tsv_file, "r") as f:
+        # Read header
+        header = f.readline().strip().split("\t")
+
+        # Validate header
+        required_cols = ["module", "definition", "name", "class"]
+        for col in required_cols:
+            if col not in header:
+                raise ValueError(f"TSV file must have '{col}' column")
+
+        module_idx = header.index("module")
+        definition_idx = header.index("definition")
+        name_idx = header.index("name")
+        class_idx = header.index("class")
+
+        # Read data rows
+        for line in f:
+            if line.strip():
+                fields = line.strip().split("\t")
+                if len(fields) > max(module_idx, definition_idx, name_idx, class_idx):
+                    module = fields[module_idx]
+                    modules_definitions[module] = fields[definition_idx]
+                    modules_names[module] = fields[name_idx]
+                    modules_classes[module] = fields[class_idx]
+
+    return modules_definitions, modules_names, modules_classes
 
 
 def parse_graphs_input(filename):
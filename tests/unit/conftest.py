@@ -0,0 +1,14 @@
+#!/usr/bin/env python3
+
+import shutil
+import tempfile
+
+import pytest
+
+
+@pytest.fixture
+def temp_dir():
+    """Create a temporary directory for test outputs"""
+    temp_path = tempfile.mkdtemp()
+    yield temp_path
+    shutil.rmtree(temp_path)
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+
+import json
+import os
+from importlib.resources import files
+
+import click
+import pytest
+from click.testing import CliRunner
+
+from kegg_pathways_completeness.bin.benchmark import (
+    IMPORTED_MODULES,
+    compare_results,
+    generate_contigs,
+    main,
+    make_result,
+    measure_import,
+)
+from kegg_pathways_completeness.bin.compiled_graphs import load_graphs
+
+PATHWAYS_DATA = files("kegg_pathways_completeness.pathways_data")
+
+
+@pytest.fixture(scope="module")
+def graphs():
+    return load_graphs(PATHWAYS_DATA.joinpath("graphs.kgc"))
+
+
+class TestBenchmark:
+    """Test suite for benchmarks"""
+
+    def test_generate_contigs(self, graphs):
+        """Test that workloads are reproducible and real-shaped contigs have KOs of one module"""
+        contigs = list(generate_contigs(graphs, 50, 4, "real", seed=1))
+        assert contigs == list(generate_contigs(graphs, 50, 4, "real", seed=1))
+        assert len(contigs) == 50
+        modules_kos = [
+            {graphs.kos[label] for label in graphs.module(num).labels}
+            for num in range(len(graphs))
+        ]
+        for _, kos in contigs:
+            assert 1 <= len(kos) <= 7
+            assert any(set(kos) <= module_kos for module_kos in modules_kos)
+
+    def test_compare_results(self):
+        """Test that only slowdowns above threshold are regressions"""
+        old = [
+            make_result("get_kos_dict", {"contigs": 10}, [1.0, 1.0]),
+            make_result("per_contig", {"contigs": 10}, [1.0]),
+            make_result("load_graphs", {}, [1.0]),
+        ]
+        new = [
+            make_result("get_kos_dict", {"contigs": 10}, [1.05]),
+            make_result("per_contig", {"contigs": 10}, [1.5]),
+            make_result("per_contig", {"contigs": 100}, [1.5]),
+        ]
+        comparison = compare_results(old, new, threshold=0.1)
+        assert [(name, regression) for name, *_, regression in comparison] == [
+            ("get_kos_dict", False),
+            ("per_contig", True),
+        ]
+
+    @pytest.mark.parametrize("module", IMPORTED_MODULES)
+    def test_lazy_imports(self, module):
+        """Test that CLIs called per sample do not import plotting backends and other heavy dependencies"""
+        seconds, heavy = measure_import(module)
+        assert seconds > 0
+        assert heavy == []
+
+    @pytest.mark.parametrize("module", ["kegg_pathways_completeness.unknown", "sys"])
+    def test_import_time_not_measured(self, module):
+        """Test that failed import and module without import time are reported instead of None"""
+        with pytest.raises(click.ClickException):
+            measure_import(module)
+
+    def test_run_and_compare(self, temp_dir):
+        """Test that results are saved to JSON and compared with themselves without regressions"""
+        output = os.path.join(temp_dir, "benchmark.json")
+        runner = CliRunner()
+        result = runner.invoke(
+            main,
+            ["run", "-o", output, "-n", "20", "-d", "2", "-r", "1", "--calls", "1"]
+            + ["--worst-modules", "1", "-w", "real"],
+        )
+        assert result.exit_code == 0, result.output
+        with open(output) as f:
+            results = json.load(f)["results"]
+        assert {result["name"] for result in results} == {
+            "import_time",
+            "load_graphs",
+            "get_kos_dict",
+            "parse_hmmer_table",
+            "finding_paths",
+            "calculate_percentage",
+            "sort_out_pathways",
+            "per_contig",
+        }
+        result = runner.invoke(main, ["compare", output, output])
+        assert result.exit_code == 0
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+
+import os
+from importlib.resources import files
+
+import networkx as nx
+import pytest
+
+from kegg_pathways_completeness.bin.compiled_graphs import (
+    CompiledGraphs,
+    compile_graphs,
+    load_graphs,
+)
+from kegg_pathways_completeness.bin.utils import (
+    parse_graphs_input,
+    parse_modules_table_tsv,
+)
+
+PATHWAYS_DATA = files("kegg_pathways_completeness.pathways_data")
+
+
+@pytest.fixture(scope="module")
+def graphs():
+    """Packaged graphs in networkx format"""
+    return parse_graphs_input(PATHWAYS_DATA.joinpath("graphs.pkl"))
+
+
+class TestCompiledGraphs:
+    """Test suite for compiled graphs"""
+
+    def test_packaged_graphs_are_up_to_date(self, graphs):
+        """Test that packaged graphs.kgc is compiled from packaged graphs.pkl and modules table"""
+        modules_info = parse_modules_table_tsv(
+            PATHWAYS_DATA.joinpath("modules_table.tsv")
+        )
+        compiled = load_graphs(PATHWAYS_DATA.joinpath("graphs.kgc"))
+        assert compiled.sections == compile_graphs(graphs, modules_info).sections
+
+    def test_modules_info(self, graphs, temp_dir):
+        """Test modules information saved together with graphs"""
+        modules_info = parse_modules_table_tsv(
+            PATHWAYS_DATA.joinpath("modules_table.tsv")
+        )
+        path = os.path.join(temp_dir, "graphs.kgc")
+        compile_graphs(graphs, modules_info).save(path)
+
+        loaded = CompiledGraphs.load(path).get_modules_info()
+        for expected, saved in zip(modules_info, loaded):
+            assert dict(saved) == expected
+        assert compile_graphs(graphs).get_modules_info() is None
+
+    def test_load_is_memory_mapped(self):
+        """Test that sections of loaded graphs are views of mapped file"""
+        compiled = load_graphs(PATHWAYS_DATA.joinpath("graphs.kgc"))
+        assert isinstance(compiled.sections["edge_weight"], memoryview)
+        assert compiled.sections["edge_weight"].readonly
+
+    def test_save_and_load(self, graphs, temp_dir):
+        """Test that saved graphs are loaded without changes"""
+        compiled = compile_graphs(graphs)
+        path = os.path.join(temp_dir, "graphs.kgc")
+        compiled.save(path)
+
+        loaded = CompiledGraphs.load(path)
+        assert loaded.sections == compiled.sections
+        assert list(loaded) == list(graphs)
+        assert "M00001" in loaded
+
+    def test_to_networkx(self, graphs):
+        """Test that networkx graphs are restored with the same edges"""
+        restored = compile_graphs(graphs).to_networkx()
+        for name in graphs:
+            graph, dict_edges, unnecessary_nodes = graphs[name]
+            assert list(restored[name][0].nodes) == list(graph.nodes)
+            assert list(restored[name][0].edges(keys=True, data=True)) == list(
+                graph.edges(keys=True, data=True)
+            )
+            # integer weights are printed differently from float ones
+            assert [type(w) for _, _, w in restored[name][0].edges(data="weight")] == [
+                type(w) for _, _, w in graph.edges(data="weight")
+            ]
+            assert restored[name][2] == unnecessary_nodes
+            assert set(restored[name][1]) == set(dict_edges)
+
+    def test_modules_by_ko(self, graphs):
+        """Test inverted index of modules by KOs"""
+        compiled = compile_graphs(graphs)
+        positions = compiled.modules_by_ko[compiled.ko_ids["K00844"]]
+        modules = [compiled.modules[position] for position in positions]
+        assert modules == [name for name in graphs if "K00844" in graphs[name][1]]
+
+    def test_not_compiled_file(self, temp_dir):
+        """Test that other files are not read as compiled graphs"""
+        path = os.path.join(temp_dir, "graphs.kgc")
+        with open(path, "wb") as f:
+            f.write(b"not compiled graphs")
+        with pytest.raises(ValueError):
+            CompiledGraphs.load(path)
+
+    def test_count_paths(self, graphs):
+        """Test that paths are counted as by enumeration of networkx graph"""
+        compiled = compile_graphs(graphs)
+        for position in range(0, len(compiled), 25):
+            graph = graphs[compiled.modules[position]][0]
+            assert compiled.module(position).count_paths() == sum(
+                1 for _ in nx.all_simple_edge_paths(graph, 0, 1)
+            )
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+
+import asyncio
+import json
+import os
+
+import pytest
+from click.testing import CliRunner
+
+from kegg_pathways_completeness.bin.completeness_server import (
+    CompletenessServer,
+    RequestError,
+    parse_request,
+    parse_rows,
+)
+from kegg_pathways_completeness.bin.give_completeness import main as give_completeness
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "../fixtures/give_completeness")
+
+
+async def send(reader, writer, method, path, request=None, close=True):
+    """Send HTTP request and return status and parsed JSON response"""
+    body = json.dumps(request).encode() if request is not None else b""
+    head = f"{method} {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\n"
+    if close:
+        head += "Connection: close\r\n"
+    writer.write(head.encode() + b"\r\n" + body)
+    await writer.drain()
+    return await read_response(reader)
+
+
+async def read_response(reader):
+    """Read HTTP response and return status and parsed JSON"""
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line == b"\r\n":
+            break
+        name, _, value = line.decode().partition(":")
+        headers[name.lower()] = value.strip()
+    response = await reader.readexactly(int(headers["content-length"]))
+    return status, json.loads(response)
+
+
+async def send_raw(socket_path, data):
+    """Send raw bytes, close writing side of connection and return response"""
+    reader, writer = await asyncio.open_unix_connection(socket_path)
+    writer.write(data)
+    writer.write_eof()
+    await writer.drain()
+    response = await read_response(reader)
+    writer.close()
+    return response
+
+
+def run_with_server(scenario, socket_path):
+    """Start server on Unix socket, run scenario(socket_path) and stop server"""
+
+    async def run():
+        server = CompletenessServer()
+        asyncio_server = await server.start(socket_path=socket_path)
+        try:
+            async with asyncio_server:
+                return await scenario(socket_path)
+        finally:
+            server.close()
+
+    return asyncio.run(run())
+
+
+def read_table(filename, contig):
+    with open(filename) as f:
+        f.readline()
+        return parse_rows(f.read(), contig=contig)
+
+
+class TestCompletenessServer:
+    """Test suite for completeness server"""
+
+    def test_parse_request(self):
+        """Test that contigs table is parsed as --input and wrong requests are rejected"""
+        contigs, per_contig = parse_request(
+            {"table": "c1\tK1\tK2\n\nc2\tK3\nc1\tK4\n", "per_contig": True}
+        )
+        assert contigs == [("c1", ["K1", "K2", "K4"]), ("c2", ["K3"])]
+        assert per_contig
+        assert parse_request({"kos": ["K1"]}) == ([("", ["K1"])], False)
+        for request in [
+            [],
+            {},
+            {"kos": ["K1"], "table": "c1\tK1"},
+            {"kos": ["K1"], "per_contig": True},
+            {"kos": "K1"},
+            {"contigs": {"c1": [1]}},
+            {"contigs": {"c\t1": ["K1"]}},
+            {"table": "c1\tK1", "per_contig": "yes"},
+        ]:
+            with pytest.raises(ValueError):
+                parse_request(request)
+        for request in [
+            {"contigs": {"": ["K1"]}},
+            {"contigs": {"c1": ["K1"], " ": ["K2"]}},
+            {"table": "c1\tK1\n\tK00001\n"},
+        ]:
+            with pytest.raises(RequestError) as error:
+                parse_request(request)
+            assert error.value.status == 400
+
+    def test_completeness_is_the_same_as_give_completeness(self, temp_dir):
+        """Test that responses have the same rows as tables of give_completeness"""
+        input_table = os.path.join(FIXTURES, "ko.combined.tsv")
+        result = CliRunner().invoke(
+            give_completeness,
+            ["-i", input_table, "-m", "-o", temp_dir, "-r", "test"],
+        )
+        assert result.exit_code == 0, result.output
+        with open(input_table) as f:
+            table = f.read()
+
+        async def scenario(socket_path):
+            reader, writer = await asyncio.open_unix_connection(socket_path)
+            # both requests use the same connection
+            health = await send(reader, writer, "GET", "/health", close=False)
+            completeness = await send(
+                reader,
+                writer,
+                "POST",
+                "/completeness",
+                {"table": table, "per_contig": True},
+            )
+            writer.close()
+            return health, completeness
+
+        socket_path = os.path.join(temp_dir, "server.sock")
+        health, completeness = run_with_server(scenario, socket_path)
+        assert health[0] == 200
+        assert health[1]["modules"] > 0
+        status, response = completeness
+        assert status == 200
+        assert response["pathways"] == read_table(
+            os.path.join(temp_dir, "test_pathways.tsv"), contig=False
+        )
+        assert response["contigs"] == read_table(
+            os.path.join(temp_dir, "test_contigs.tsv"), contig=True
+        )
+
+    def test_errors(self, temp_dir):
+        """Test that wrong requests get error status and do not stop server"""
+
+        async def scenario(socket_path):
+            responses = []
+            for method, path, request in [
+                ("POST", "/completeness", {"kos": "K00001"}),
+                ("POST", "/completeness", {"contigs": {"": ["K00001"]}}),
+                ("POST", "/completeness", {"table": "\tK00001", "per_contig": True}),
+                ("GET", "/completeness", None),
+                ("GET", "/unknown", None),
+                ("POST", "/completeness", {"kos": ["K00873", "K01951", "K00942"]}),
+            ]:
+                reader, writer = await asyncio.open_unix_connection(socket_path)
+                responses.append(await send(reader, writer, method, path, request))
+                writer.close()
+            return responses
+
+        responses = run_with_server(scenario, os.path.join(temp_dir, "server.sock"))
+        assert [status for status, _ in responses] == [400, 400, 400, 405, 404, 200]
+        assert "error" in responses[0][1]
+        assert responses[5][1]["pathways"][0]["module_accession"] == "M00050"
+
+    def test_malformed_requests(self, temp_dir):
+        """Test that malformed and too large requests get error status instead of dropped connection"""
+        body = json.dumps({"kos": ["K00873"]}).encode()
+        requests = [
+            b"POST /completeness HTTP/1.1\r\nContent-Length: -5\r\n\r\n",
+            b"POST /completeness HTTP/1.1\r\nContent-Length: many\r\n\r\n",
+            b"GET /health HTTP/1.1\r\nX-Long: " + b"a" * 2**17 + b"\r\n\r\n",
+            b"GET /" + b"a" * 2**17 + b" HTTP/1.1\r\n\r\n",
+            b"POST /completeness HTTP/1.1\r\nContent-Length: 100\r\n\r\n" + body,
+            b"POST /completeness HTTP/1.1\r\nContent-Length: 2000000000\r\n\r\n",
+        ]
+
+        async def scenario(socket_path):
+            responses = [await send_raw(socket_path, request) for request in requests]
+            # server still works
+            reader, writer = await asyncio.open_unix_connection(socket_path)
+            responses.append(await send(reader, writer, "GET", "/health"))
+            writer.close()
+            return responses
+
+        responses = run_with_server(scenario, os.path.join(temp_dir, "server.sock"))
+        assert [status for status, _ in responses] == [
+            400,
+            400,
+            413,
+            413,
+            400,
+            413,
+            200,
+        ]
+        assert all("error" in response for _, response in responses[:-1])
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+
+import pickle
+import shutil
+import tempfile
+from importlib.resources import files
+
+import networkx as nx
+import pytest
+
+from kegg_pathways_completeness.bin.definition_parser import (
+    parse_definition,
+    tokenize,
+)
+from kegg_pathways_completeness.bin.make_graphs import (
+    GraphsGenerator,
+    get_definition_hash,
+)
+from kegg_pathways_completeness.bin.utils import parse_modules_table_tsv
+
+PATHWAYS_DATA = files("kegg_pathways_completeness.pathways_data")
+
+
+@pytest.fixture(scope="module")
+def generator():
+    """Graphs generator with temporary output directory"""
+    temp_path = tempfile.mkdtemp()
+    yield GraphsGenerator(input_file=None, output_dir=temp_path)
+    shutil.rmtree(temp_path)
+
+
+def recursive_graph(generator, definition):
+    graph = nx.MultiDiGraph(definition_hash=get_definition_hash(definition))
+    graph.add_node(0, color="green")
+    graph.add_node(1, color="red")
+    return generator.recursive_parsing(graph, {}, [], definition, 0, 1, 1)
+
+
+class TestDefinitionParser:
+    """Test suite for parsing of module definitions in one pass"""
+
+    def test_tokenize(self):
+        """Test that definition is split into KOs, separators and brackets"""
+        assert [token for token, _, _ in tokenize("(K1,K2) -K3+K4")] == [
+            "(",
+            "KO",
+            ",",
+            "KO",
+            ")",
+            " ",
+            "-",
+            "KO",
+            "+",
+            "KO",
+        ]
+
+    def test_precedence(self):
+        """Test that ',' is the loosest separator and '-' the tightest one"""
+        assert parse_definition("K1 K2+K3-K4,K5") == (
+            ",",
+            [
+                (
+                    " ",
+                    [
+                        ("KO", 0, 2),
+                        ("+", [("KO", 3, 5), ("-", [("KO", 6, 8), ("KO", 9, 11)])]),
+                    ],
+                ),
+                ("KO", 12, 14),
+            ],
+        )
+
+    def test_optional_and_missing(self):
+        """Test -KO and -- parts"""
+        assert parse_definition("K1 -K2 --") == (
+            " ",
+            [("KO", 0, 2), ("-KO", 4, 6), ("--",)],
+        )
+
+    @pytest.mark.parametrize(
+        "definition",
+        ["", "K1  K2", "(K1)(K2)", "K1 (K2", "K1) K2", "-(K1 K2)", "-K1-K2", "(--)"],
+    )
+    def test_not_accepted(self, definition):
+        """Test that definitions parsed in a special way by recursive_parsing are not accepted"""
+        with pytest.raises(ValueError):
+            parse_definition(definition)
+
+    def test_same_graphs(self, generator):
+        """Test that graphs of all modules are the same as made by recursive_parsing"""
+        definitions = parse_modules_table_tsv(
+            PATHWAYS_DATA.joinpath("modules_table.tsv")
+        )[0]
+        for module, definition in definitions.items():
+            expected = recursive_graph(generator, definition)
+            assert pickle.dumps(generator.make_graph(definition)) == pickle.dumps(
+                expected
+            ), module
+
+    def test_fallback(self, generator):
+        """Test that definitions not accepted by parser are parsed by recursive_parsing"""
+        definition = "K1 -K2-K3"
+        assert pickle.dumps(generator.make_graph(definition)) == pickle.dumps(
+            recursive_graph(generator, definition)
+        )
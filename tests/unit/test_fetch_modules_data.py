@@ -1,8 +1,6 @@
 #!/usr/bin/env python3
 
 import os
-import shutil
-import tempfile
 from unittest.mock import MagicMock, Mock, patch
 
 import pytest
@@ -37,14 +35,6 @@ CLASS       Pathway modules; Carbohydrate metabolism; Central carbohydrate metab
 """
 
 
-@pytest.fixture
-def temp_dir():
-    """Create a temporary directory for test outputs"""
-    temp_path = tempfile.mkdtemp()
-    yield temp_path
-    shutil.rmtree(temp_path)
-
-
 @pytest.fixture
 def mock_session():
     """Create a mock session with predefined responses"""
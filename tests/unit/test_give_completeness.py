@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+
+import logging
+import random
+
+import pytest
+
+from kegg_pathways_completeness.bin import give_completeness
+from kegg_pathways_completeness.bin.compiled_graphs import compile_graphs
+from kegg_pathways_completeness.bin.give_completeness import CompletenessCalculator
+from kegg_pathways_completeness.bin.make_graphs import GraphsGenerator
+
+# small pool of KOs, so the same KO appears several times in definition
+KOS = [f"K{num:05d}" for num in range(1, 7)]
+
+
+def random_definition(rng, depth=3):
+    """Random module definition with steps, alternatives, complexes and optional KOs"""
+    if depth == 0 or rng.random() < 0.25:
+        return rng.choice(KOS)
+    separator = rng.choice([" ", " ", ",", "+"])
+    if separator == "+":
+        # members of complex, the first one can not be optional
+        members = [rng.choice(KOS) for _ in range(rng.randint(2, 3))]
+        return members[0] + "".join(
+            rng.choice(["+", "+", "-"]) + KO for KO in members[1:]
+        )
+    parts = [random_definition(rng, depth - 1) for _ in range(rng.randint(2, 3))]
+    return "(" + separator.join(parts) + ")"
+
+
+def enumerate_paths(graph, presented):
+    """
+    All paths from starts to sink as (sum of weights, sum of new weights, labels)
+    in order of full enumeration: by incoming edges of node, then by paths of their predecessors
+    """
+    paths = {node: [(0, 0, [])] for node in graph.starts}
+    for num in range(len(graph.source)):
+        label = graph.label[num]
+        weight_new = 0 if label in presented else graph.weight_new[num]
+        paths.setdefault(graph.target[num], []).extend(
+            (weight + graph.weight[num], new_weight + weight_new, labels + [label])
+            for weight, new_weight, labels in paths[graph.source[num]]
+        )
+    return paths[graph.sink]
+
+
+@pytest.fixture(scope="module")
+def random_graphs(tmp_path_factory):
+    """Compiled graphs of random definitions"""
+    rng = random.Random(0)
+    generator = GraphsGenerator(
+        input_file=None, output_dir=str(tmp_path_factory.mktemp("graphs"))
+    )
+    graphs = {
+        f"M{num:05d}": generator.make_graph(random_definition(rng))
+        for num in range(300)
+    }
+    return compile_graphs(graphs)
+
+
+@pytest.fixture(scope="module")
+def calculator(random_graphs, tmp_path_factory):
+    return CompletenessCalculator(
+        input_KOs={},
+        outdir=str(tmp_path_factory.mktemp("output")),
+        outprefix="test",
+        graphs=random_graphs,
+        include_weights=False,
+        plot_pathways=False,
+        per_contig=False,
+    )
+
+
+class TestFindingPaths:
+    """Test suite for search of the best path of module"""
+
+    def test_the_same_as_enumeration_of_paths(self, random_graphs, calculator):
+        """Test that the best ratio, number of best paths and the first best path match full enumeration"""
+        rng = random.Random(1)
+        for position in range(len(random_graphs)):
+            graph = random_graphs.module(position)
+            labels = sorted(graph.labels)
+            for _ in range(5):
+                presented = frozenset(rng.sample(labels, rng.randint(0, len(labels))))
+                paths = enumerate_paths(graph, presented)
+                metrics = [1.0 * new / weight for weight, new, _ in paths]
+                best_labels = [
+                    path[2]
+                    for path, metric in zip(paths, metrics)
+                    if metric == min(metrics)
+                ]
+
+                path_labels, metric, number_of_paths = calculator.finding_paths(
+                    graph, presented
+                )
+                assert metric == min(metrics)
+                assert number_of_paths == len(best_labels)
+                assert path_labels == best_labels[0]
+
+    def test_not_converged(self, random_graphs, calculator, monkeypatch, caplog):
+        """Test that search stopped by limit of iterations is reported and returns a path with its ratio"""
+        monkeypatch.setattr(give_completeness, "MAX_RATIO_ITERATIONS", 1)
+        graph = random_graphs.module(0)
+        presented = frozenset(sorted(graph.labels)[:1])
+        paths = enumerate_paths(graph, presented)
+        metrics = {tuple(labels): 1.0 * new / weight for weight, new, labels in paths}
+        with caplog.at_level(logging.WARNING):
+            path_labels, metric, number_of_paths = calculator.finding_paths(
+                graph, presented
+            )
+        assert "not converged" in caplog.text
+        assert metrics[tuple(path_labels)] == metric
+        assert metric >= min(metrics.values())
+        assert number_of_paths >= 1
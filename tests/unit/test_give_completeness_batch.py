@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+
+import os
+
+import numpy as np
+
+from kegg_pathways_completeness.bin.give_completeness_batch import (
+    MATRIX_SUFFIX,
+    MODULES_SUFFIX,
+    SAMPLES_SUFFIX,
+    save_completeness_matrix,
+)
+
+
+class TestCompletenessMatrix:
+    """Test suite for sample x module completeness matrix"""
+
+    def test_save_completeness_matrix(self, temp_dir):
+        """Test that completeness is saved by sample and module indexes"""
+        prefix = os.path.join(temp_dir, "test")
+        save_completeness_matrix(
+            prefix=prefix,
+            samples=["sample1", "sample2"],
+            modules=["M00001", "M00002", "M00050"],
+            samples_completeness={
+                "sample1": {"M00050": 50.0, "M00001": 11.11},
+                "sample2": {},
+            },
+        )
+
+        # all arrays are memory-mapped instead of being read
+        completeness = np.load(prefix + MATRIX_SUFFIX, mmap_mode="r")
+        samples = np.load(prefix + SAMPLES_SUFFIX, mmap_mode="r")
+        modules = np.load(prefix + MODULES_SUFFIX, mmap_mode="r")
+        assert isinstance(completeness, np.memmap)
+        assert list(samples) == ["sample1", "sample2"]
+        assert list(modules) == ["M00001", "M00002", "M00050"]
+        assert completeness.tolist() == [
+            [11.11, 0.0, 50.0],
+            [0.0, 0.0, 0.0],
+        ]
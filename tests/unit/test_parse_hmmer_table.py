@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+
+import os
+import random
+import shutil
+import tempfile
+
+import pytest
+
+from kegg_pathways_completeness.bin import parse_hmmer_table
+from kegg_pathways_completeness.bin.parse_hmmer_table import (
+    ContigResolver,
+    HmmerTableConverter,
+    HmmerTableParser,
+    get_line_chunks,
+    parse_ko_thresholds,
+    read_fasta_names,
+)
+from kegg_pathways_completeness.bin.utils import open_file
+
+FIXTURES = os.path.join("tests", "fixtures", "parse_hmmtable")
+FASTA = ">contig_1 first protein\nMKV\nLLA\n>contig_2\nMAA\n\n>contig_3\tdesc\nM"
+
+
+@pytest.fixture
+def fasta_file():
+    """Create a FASTA file in temporary directory"""
+    temp_path = tempfile.mkdtemp()
+    path = os.path.join(temp_path, "test.faa")
+    with open(path, "w") as f:
+        f.write(FASTA)
+    yield path
+    shutil.rmtree(temp_path)
+
+
+class TestContigResolver:
+    """Test suite for matching of HMMER hits to FASTA names"""
+
+    def test_exact_name(self):
+        """Test that hit with FASTA name is matched"""
+        resolver = ContigResolver(["contig_1", "contig_2"])
+        assert resolver.resolve("contig_2") == ["contig_2"]
+
+    def test_name_in_hit(self):
+        """Test that FASTA name is found inside of longer hit name"""
+        resolver = ContigResolver(["NODE-1_1", "NODE-2_1"])
+        assert resolver.resolve("ERZ1.NODE-2_1 # 1 # 300") == ["NODE-2_1"]
+
+    def test_not_found(self):
+        """Test that hit without FASTA name is not matched"""
+        resolver = ContigResolver(["contig_1"])
+        assert resolver.resolve("contig_2") == []
+        assert resolver.resolve("") == []
+
+    def test_ambiguous(self):
+        """Test that all FASTA names in hit are returned in order of FASTA file"""
+        resolver = ContigResolver(["contig_11", "contig_1", "contig_2"])
+        assert resolver.resolve("contig_11") == ["contig_11", "contig_1"]
+        assert resolver.resolve("contig_11") == ["contig_11", "contig_1"]
+
+    def test_exact_name_not_cached(self):
+        """Test that hit with FASTA name is resolved without substring search"""
+        resolver = ContigResolver(["contig_1", "contig_2"])
+        assert resolver.resolve("contig_1") == ["contig_1"]
+        assert resolver.resolve_substrings.cache_info().currsize == 0
+
+    def test_cache_is_bounded(self):
+        """Test that number of remembered results of substring search is limited"""
+        resolver = ContigResolver(["NODE-1_1"], cache_size=2)
+        for num in range(5):
+            assert resolver.resolve(f"ERZ{num}.NODE-1_1") == ["NODE-1_1"]
+        assert resolver.resolve_substrings.cache_info().currsize == 2
+
+    def test_the_same_as_scan_of_names(self):
+        """Test that resolved names match scan of all FASTA names in hit"""
+        rng = random.Random(0)
+        for _ in range(200):
+            names = list(
+                {
+                    "".join(rng.choices("ab_1", k=rng.randint(1, 6)))
+                    for _ in range(rng.randint(1, 8))
+                }
+            )
+            resolver = ContigResolver(names)
+            for _ in range(20):
+                contig = "".join(rng.choices("ab_1", k=rng.randint(0, 10)))
+                assert resolver.resolve(contig) == [
+                    name for name in names if name in contig
+                ]
+            for name in names:
+                assert resolver.resolve(name) == [
+                    other for other in names if other in name
+                ]
+
+    def test_empty_fasta(self):
+        """Test that nothing is found without FASTA names"""
+        resolver = ContigResolver([])
+        assert resolver.resolve("contig_1") == []
+
+
+class TestReadFastaNames:
+    """Test suite for reading names of FASTA records from headers"""
+
+    def test_read_names(self, fasta_file):
+        """Test that names are the first words of headers in order of file"""
+        names = list(read_fasta_names(fasta_file))
+        assert names == ["contig_1", "contig_2", "contig_3"]
+
+    def test_read_names_mmap(self, fasta_file):
+        """Test that memory-mapped scan gives the same names"""
+        names = list(read_fasta_names(fasta_file, use_mmap=True))
+        assert names == ["contig_1", "contig_2", "contig_3"]
+
+    def test_read_names_from_index(self, fasta_file):
+        """Test that names are taken from up to date .fai index"""
+        with open(fasta_file + ".fai", "w") as f:
+            f.write("indexed_1\t6\t22\t3\t4\nindexed_2\t3\t45\t3\t4\n")
+        assert list(read_fasta_names(fasta_file)) == ["indexed_1", "indexed_2"]
+
+        # index older than FASTA is ignored
+        os.utime(fasta_file + ".fai", (0, 0))
+        names = list(read_fasta_names(fasta_file))
+        assert names == ["contig_1", "contig_2", "contig_3"]
+
+    @pytest.mark.parametrize("suffix", [".gz", ".zst"])
+    def test_read_names_compressed(self, fasta_file, suffix):
+        """Test that names are read from compressed FASTA"""
+        if suffix == ".zst":
+            pytest.importorskip("zstandard")
+        with open_file(fasta_file + suffix, "w") as f:
+            f.write(FASTA)
+        names = list(read_fasta_names(fasta_file + suffix, use_mmap=True))
+        assert names == ["contig_1", "contig_2", "contig_3"]
+
+
+class TestParallelParsing:
+    """Test suite for parsing of HMMER table in worker processes"""
+
+    def test_line_chunks(self):
+        """Test that chunks cover the whole file and end at the ends of lines"""
+        path = os.path.join(FIXTURES, "hmmscan_output.txt")
+        chunks = get_line_chunks(path, chunk_size=100)
+        assert chunks[0][0] == 0 and chunks[-1][1] == os.path.getsize(path)
+        with open(path, "rb") as f:
+            data = f.read()
+        for (_, end), (start, _) in zip(chunks, chunks[1:]):
+            assert end == start and data[end - 1: end] == b"\n"
+
+    @pytest.mark.parametrize("hmmtool", ["hmmscan", "hmmsearch"])
+    def test_parallel_parsing(self, hmmtool):
+        """Test that KOs are assigned to contigs as in one process"""
+        path = os.path.join(FIXTURES, f"{hmmtool}_output.txt")
+        parser = HmmerTableParser(
+            input_table=path,
+            input_fasta=os.path.join(FIXTURES, "test.fasta"),
+            output_dir=tempfile.gettempdir(),
+            hmmtool=hmmtool,
+        )
+        contigs, contigs_parallel = parser.get_dir_contigs(), parser.get_dir_contigs()
+        converter = HmmerTableConverter(input_file=path, output_file=None)
+        parser.add_annotations(contigs, converter.iterate())
+        parser.add_annotations_parallel(
+            contigs_parallel, path, threads=2, chunk_size=100
+        )
+        assert contigs_parallel == contigs
+
+    def test_worker_returns_unresolved_hits(self, monkeypatch):
+        """Test that worker parses hits without FASTA names, they are resolved in main process"""
+        path = os.path.join(FIXTURES, "hmmscan_output.txt")
+        monkeypatch.setattr(parse_hmmer_table, "_worker_state", None)
+        parse_hmmer_table.init_worker("hmmscan", tempfile.gettempdir(), path, False, {})
+        hits, converted_lines = parse_hmmer_table.parse_chunk(0, os.path.getsize(path))
+        assert converted_lines == ""
+        parser = HmmerTableParser(
+            input_table=path,
+            input_fasta=None,
+            output_dir=tempfile.gettempdir(),
+            hmmtool="hmmscan",
+        )
+        converter = HmmerTableConverter(input_file=path, output_file=None)
+        assert hits == [parser.parse_line(line) for line in converter.iterate()]
+
+
+class TestKoThresholds:
+    """Test suite for reading KO thresholds from KOfam ko_list"""
+
+    def test_thresholds(self):
+        """Test that thresholds are read with column of their score type"""
+        thresholds = parse_ko_thresholds(os.path.join(FIXTURES, "ko_list.tsv"))
+        assert thresholds == {"K00844": (250.0, 7), "K03406": (150.0, 13)}
+
+    def test_no_columns(self, fasta_file):
+        """Test that file without threshold columns is not accepted"""
+        with pytest.raises(ValueError):
+            parse_ko_thresholds(fasta_file)
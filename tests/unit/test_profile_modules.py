@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+
+import os
+
+from click.testing import CliRunner
+
+from kegg_pathways_completeness.bin.profile_modules import COLUMNS, main
+
+GRAPHS = os.path.join("tests", "fixtures", "make_graphs", "graphs.pkl")
+
+
+class TestProfileModules:
+    """Test suite for per-module profile report"""
+
+    def test_profile(self, temp_dir):
+        """Test sizes, numbers of paths and branching of modules and order by time"""
+        output = os.path.join(temp_dir, "profile.tsv")
+        result = CliRunner().invoke(main, ["-g", GRAPHS, "-o", output, "-r", "1"])
+        assert result.exit_code == 0, result.output
+        with open(output) as f:
+            header = f.readline().rstrip("\n").split("\t")
+            rows = [dict(zip(header, line.rstrip("\n").split("\t"))) for line in f]
+        assert header == COLUMNS
+        profiles = {
+            row["module"]: [int(row[column]) for column in COLUMNS[1:-1]]
+            for row in rows
+        }
+        # nodes, edges, kos, paths, max_branching
+        assert profiles == {
+            # ((K01007,K01006) K01595,K01959+K01960,K01958)
+            "M1": [4, 6, 6, 4, 4],
+            # K21183 (K21181 K21182 K21188)
+            "M2": [5, 4, 4, 1, 1],
+            # K03146 (K18278 K00877 K14154 -- K00949)
+            "M3": [7, 6, 6, 1, 1],
+            "M4": [9, 15, 15, 40, 3],
+        }
+        times = [float(row["time_ms"]) for row in rows]
+        assert times == sorted(times, reverse=True)
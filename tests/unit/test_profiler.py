@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import pickle
+
+from kegg_pathways_completeness.bin.profiler import Profiler, stage
+
+
+class TestProfiler:
+    """Test suite for Profiler"""
+
+    def test_stages_and_modules(self):
+        """Test that calls are counted and times of worker processes are merged"""
+        profiler = Profiler()
+        for _ in range(2):
+            with stage(profiler, "common_summary"):
+                pass
+        profiler.add_module_time("M00001", 1.0)
+        worker = pickle.loads(pickle.dumps(Profiler()))
+        worker.add_module_time("M00001", 2.0)
+        worker.add_module_time("M00002", 4.0)
+        profiler.merge_modules(worker.pop_modules())
+        assert worker.modules == {}
+
+        report = profiler.report()
+        assert report["stages"]["common_summary"]["calls"] == 2
+        assert report["modules"] == {
+            "M00002": {"time_s": 4.0, "calls": 1},
+            "M00001": {"time_s": 3.0, "calls": 2},
+        }
+        assert list(report["modules"]) == ["M00002", "M00001"]
+
+    def test_disabled(self):
+        """Test that stage without profiler does nothing"""
+        with stage(None, "common_summary"):
+            pass
+
+    def test_save(self, temp_dir):
+        """Test that report is saved to JSON with extra values"""
+        filename = os.path.join(temp_dir, "profile.json")
+        profiler = Profiler()
+        with stage(profiler, "input_parsing"):
+            pass
+        profiler.save(filename, cache={"hits": 1, "misses": 2})
+        with open(filename) as f:
+            report = json.load(f)
+        assert report["cache"] == {"hits": 1, "misses": 2}
+        assert "input_parsing" in report["stages"]
+        assert "peak_rss_mb" in report